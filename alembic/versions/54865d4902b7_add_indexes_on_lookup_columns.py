@@ -0,0 +1,45 @@
+"""add indexes on lookup columns
+
+Revision ID: 54865d4902b7
+Revises: cea232fe4aef
+Create Date: 2026-10-18 10:12:41.391817
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '54865d4902b7'
+down_revision: Union[str, None] = 'cea232fe4aef'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_bug_title_id", "bug", ["title_id"])
+    op.create_index("ix_bug_description_id", "bug", ["description_id"])
+    op.create_index("ix_bug_comment_bug_id", "bug_comment", ["bug_id"])
+    op.create_index("ix_bug_comment_text_id", "bug_comment", ["text_id"])
+
+    # A text has one embedding: keep the most recent one before enforcing it.
+    op.execute(
+        "DELETE FROM embedding e USING embedding newer "
+        "WHERE e.text_id = newer.text_id AND e.id < newer.id"
+    )
+    op.create_index("ix_embedding_text_id", "embedding", ["text_id"], unique=True)
+
+    op.create_index("ix_maas_commit_sha", "maas", ["commit_sha"])
+    op.create_index("ix_maas_commit_date", "maas", ["commit_date"])
+    op.create_index("ix_merge_proposal_date_merged", "merge_proposal", ["date_merged"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_merge_proposal_date_merged", "merge_proposal")
+    op.drop_index("ix_maas_commit_date", "maas")
+    op.drop_index("ix_maas_commit_sha", "maas")
+    op.drop_index("ix_embedding_text_id", "embedding")
+    op.drop_index("ix_bug_comment_text_id", "bug_comment")
+    op.drop_index("ix_bug_comment_bug_id", "bug_comment")
+    op.drop_index("ix_bug_description_id", "bug")
+    op.drop_index("ix_bug_title_id", "bug")
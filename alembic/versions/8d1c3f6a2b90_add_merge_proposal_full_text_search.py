@@ -0,0 +1,39 @@
+"""add merge proposal full text search
+
+Revision ID: 8d1c3f6a2b90
+Revises: 54865d4902b7
+Create Date: 2026-10-18 11:02:17.204518
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '8d1c3f6a2b90'
+down_revision: Union[str, None] = '54865d4902b7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Generated column: postgres keeps it up to date on every insert and update of the commit message.
+    op.add_column(
+        "merge_proposal",
+        sa.Column(
+            "commit_message_tsv",
+            postgresql.TSVECTOR,
+            sa.Computed("to_tsvector('english', coalesce(commit_message, ''))", persisted=True),
+        )
+    )
+    op.create_index(
+        "ix_merge_proposal_commit_message_tsv", "merge_proposal", ["commit_message_tsv"], postgresql_using="gin"
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_merge_proposal_commit_message_tsv", "merge_proposal")
+    op.drop_column("merge_proposal", "commit_message_tsv")
@@ -0,0 +1,38 @@
+"""add last update source
+
+Revision ID: a1d9e5c3f702
+Revises: f6a4c2e8b137
+Create Date: 2026-10-18 17:12:09.503114
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'a1d9e5c3f702'
+down_revision: Union[str, None] = 'f6a4c2e8b137'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# The only watermark so far is the one of the bugs of the default project.
+DEFAULT_SOURCE = "bugs/maas"
+
+
+def upgrade() -> None:
+    op.add_column("last_update", sa.Column("source", sa.String(256), nullable=True))
+    op.execute(sa.text("UPDATE last_update SET source = :source").bindparams(source=DEFAULT_SOURCE))
+    op.alter_column("last_update", "source", nullable=False)
+    op.create_index("ix_last_update_source", "last_update", ["source"], unique=True)
+    # The row was inserted with an explicit id, so the sequence of the column was never used.
+    op.execute(
+        "SELECT setval('last_update_id_seq', (SELECT coalesce(max(id), 0) + 1 FROM last_update), false)"
+    )
+
+
+def downgrade() -> None:
+    op.execute(sa.text("DELETE FROM last_update WHERE source != :source").bindparams(source=DEFAULT_SOURCE))
+    op.drop_index("ix_last_update_source", "last_update")
+    op.drop_column("last_update", "source")
@@ -0,0 +1,31 @@
+"""add keyset pagination indexes
+
+Revision ID: b4e7a9c1d352
+Revises: 8d1c3f6a2b90
+Create Date: 2026-10-18 11:47:03.518204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'b4e7a9c1d352'
+down_revision: Union[str, None] = '8d1c3f6a2b90'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # The pages are sorted by date and then id: the id has to be in the index too for the seek to the next page.
+    op.drop_index("ix_maas_commit_date", "maas")
+    op.create_index("ix_maas_commit_date_id", "maas", ["commit_date", "id"])
+    op.drop_index("ix_merge_proposal_date_merged", "merge_proposal")
+    op.create_index("ix_merge_proposal_date_merged_id", "merge_proposal", ["date_merged", "id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_merge_proposal_date_merged_id", "merge_proposal")
+    op.create_index("ix_merge_proposal_date_merged", "merge_proposal", ["date_merged"])
+    op.drop_index("ix_maas_commit_date_id", "maas")
+    op.create_index("ix_maas_commit_date", "maas", ["commit_date"])
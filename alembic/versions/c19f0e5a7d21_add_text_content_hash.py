@@ -0,0 +1,29 @@
+"""add text content hash
+
+Revision ID: c19f0e5a7d21
+Revises: b4e7a9c1d352
+Create Date: 2026-10-18 12:31:55.042177
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'c19f0e5a7d21'
+down_revision: Union[str, None] = 'b4e7a9c1d352'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("text", sa.Column("content_hash", sa.String(64), nullable=True))
+    # Same digest as hashlib.sha256(content.encode()).hexdigest()
+    op.execute("UPDATE text SET content_hash = encode(sha256(convert_to(content, 'UTF8')), 'hex')")
+    op.alter_column("text", "content_hash", nullable=False)
+
+
+def downgrade() -> None:
+    op.drop_column("text", "content_hash")
@@ -0,0 +1,30 @@
+"""add merge proposal web link index
+
+Revision ID: c7e2f4a9b518
+Revises: a1d9e5c3f702
+Create Date: 2026-10-18 18:02:44.172930
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7e2f4a9b518'
+down_revision: Union[str, None] = 'a1d9e5c3f702'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # The crawler stored again the MPs merged at the date of the latest one: keep the first copy.
+    op.execute(
+        "DELETE FROM merge_proposal duplicate USING merge_proposal original "
+        "WHERE duplicate.web_link = original.web_link AND duplicate.id > original.id"
+    )
+    # The crawler upserts the MPs on their web link.
+    op.create_index("ix_merge_proposal_web_link", "merge_proposal", ["web_link"], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_merge_proposal_web_link", "merge_proposal")
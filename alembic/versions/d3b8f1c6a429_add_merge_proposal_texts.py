@@ -0,0 +1,54 @@
+"""add merge proposal texts
+
+Revision ID: d3b8f1c6a429
+Revises: c7e2f4a9b518
+Create Date: 2026-10-18 18:47:30.665021
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'd3b8f1c6a429'
+down_revision: Union[str, None] = 'c7e2f4a9b518'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("merge_proposal", sa.Column("description", sa.Text, nullable=True))
+    # The commit message and the description are also stored as texts, to be embedded like the ones of the bugs.
+    op.add_column("merge_proposal", sa.Column("commit_message_text_id", sa.Integer, nullable=True))
+    op.add_column("merge_proposal", sa.Column("description_text_id", sa.Integer, nullable=True))
+    # The descriptions are filled in by the next full crawl, the commit messages are already here.
+    op.execute(
+        "UPDATE merge_proposal SET commit_message_text_id = nextval('text_id_seq') WHERE commit_message IS NOT NULL"
+    )
+    # Same digest as hashlib.sha256(content.encode()).hexdigest()
+    op.execute(
+        "INSERT INTO text (id, content, content_hash) "
+        "SELECT commit_message_text_id, commit_message, encode(sha256(convert_to(commit_message, 'UTF8')), 'hex') "
+        "FROM merge_proposal WHERE commit_message_text_id IS NOT NULL"
+    )
+    for column in ("commit_message_text_id", "description_text_id"):
+        op.create_foreign_key(
+            f"merge_proposal_{column}_fkey", "merge_proposal", "text", [column], ["id"], ondelete="SET NULL"
+        )
+        op.create_index(f"ix_merge_proposal_{column}", "merge_proposal", [column])
+
+
+def downgrade() -> None:
+    for column in ("description_text_id", "commit_message_text_id"):
+        op.drop_index(f"ix_merge_proposal_{column}", "merge_proposal")
+        op.drop_constraint(f"merge_proposal_{column}_fkey", "merge_proposal", type_="foreignkey")
+    # Their embeddings are cascaded.
+    op.execute(
+        "DELETE FROM text WHERE id IN ("
+        "SELECT commit_message_text_id FROM merge_proposal UNION SELECT description_text_id FROM merge_proposal)"
+    )
+    op.drop_column("merge_proposal", "description_text_id")
+    op.drop_column("merge_proposal", "commit_message_text_id")
+    op.drop_column("merge_proposal", "description")
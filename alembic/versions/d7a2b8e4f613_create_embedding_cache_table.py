@@ -0,0 +1,31 @@
+"""create embedding cache table
+
+Revision ID: d7a2b8e4f613
+Revises: c19f0e5a7d21
+Create Date: 2026-10-18 13:05:41.882310
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'd7a2b8e4f613'
+down_revision: Union[str, None] = 'c19f0e5a7d21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "embedding_cache",
+        sa.Column("model", sa.String(256), primary_key=True),
+        sa.Column("content_hash", sa.String(64), primary_key=True),
+        sa.Column("embedding", sa.LargeBinary, nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("embedding_cache")
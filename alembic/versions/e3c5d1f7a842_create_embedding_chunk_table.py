@@ -0,0 +1,38 @@
+"""create embedding chunk table
+
+Revision ID: e3c5d1f7a842
+Revises: d7a2b8e4f613
+Create Date: 2026-10-18 13:48:12.630953
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from sqlalchemy.schema import CreateSequence, DropSequence, Sequence
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'e3c5d1f7a842'
+down_revision: Union[str, None] = 'd7a2b8e4f613'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute(CreateSequence(Sequence('embedding_chunk_id_seq')))
+    op.create_table(
+        "embedding_chunk",
+        sa.Column("id", sa.Integer, server_default=sa.text(
+            "nextval('embedding_chunk_id_seq')"), primary_key=True),
+        sa.Column("text_id", sa.Integer, sa.ForeignKey(
+            "text.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("position", sa.Integer, nullable=False),
+        sa.Column("embedding", sa.LargeBinary, nullable=False),
+    )
+    op.create_index("ix_embedding_chunk_text_id", "embedding_chunk", ["text_id"])
+
+
+def downgrade() -> None:
+    op.drop_table("embedding_chunk")
+    op.execute(DropSequence(Sequence('embedding_chunk_id_seq')))
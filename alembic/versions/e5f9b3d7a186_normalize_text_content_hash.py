@@ -0,0 +1,30 @@
+"""normalize text content hash
+
+Revision ID: e5f9b3d7a186
+Revises: d3b8f1c6a429
+Create Date: 2026-10-18 19:12:40.518203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5f9b3d7a186'
+down_revision: Union[str, None] = 'd3b8f1c6a429'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Same digest as spaghettihub.common.llm.cache.text_hash: NFC, runs of whitespaces collapsed to a single space,
+    # stripped. A text whose whitespaces postgres and python do not agree on only gets a new text, and a cached
+    # embedding, the next time its bug is updated.
+    op.execute(
+        "UPDATE text SET content_hash = encode(sha256(convert_to("
+        "btrim(regexp_replace(normalize(content, NFC), '\\s+', ' ', 'g')), 'UTF8')), 'hex')"
+    )
+
+
+def downgrade() -> None:
+    op.execute("UPDATE text SET content_hash = encode(sha256(convert_to(content, 'UTF8')), 'hex')")
@@ -0,0 +1,47 @@
+"""add embedding model
+
+Revision ID: f6a4c2e8b137
+Revises: e3c5d1f7a842
+Create Date: 2026-10-18 16:05:41.218437
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'f6a4c2e8b137'
+down_revision: Union[str, None] = 'e3c5d1f7a842'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# The model of all the embeddings computed so far.
+DEFAULT_MODEL = "BAAI/bge-large-en-v1.5"
+
+
+def upgrade() -> None:
+    for table in ("embedding", "embedding_chunk"):
+        op.add_column(table, sa.Column("model", sa.String(256), nullable=True))
+        op.execute(sa.text(f"UPDATE {table} SET model = :model").bindparams(model=DEFAULT_MODEL))
+        op.alter_column(table, "model", nullable=False)
+    # A text has an embedding per model.
+    op.drop_index("ix_embedding_text_id", "embedding")
+    op.create_index("ix_embedding_text_id_model", "embedding", ["text_id", "model"], unique=True)
+    # The snapshot of a model is written by streaming its embeddings in id order. The search index is loaded and
+    # refreshed by diffing the text ids of the model against the ones the snapshot and the index hold.
+    op.create_index("ix_embedding_model_id", "embedding", ["model", "id"])
+    op.drop_index("ix_embedding_chunk_text_id", "embedding_chunk")
+    op.create_index("ix_embedding_chunk_text_id_model", "embedding_chunk", ["text_id", "model"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_embedding_chunk_text_id_model", "embedding_chunk")
+    op.drop_index("ix_embedding_model_id", "embedding")
+    op.drop_index("ix_embedding_text_id_model", "embedding")
+    for table in ("embedding", "embedding_chunk"):
+        op.execute(sa.text(f"DELETE FROM {table} WHERE model != :model").bindparams(model=DEFAULT_MODEL))
+        op.drop_column(table, "model")
+    op.create_index("ix_embedding_chunk_text_id", "embedding_chunk", ["text_id"])
+    op.create_index("ix_embedding_text_id", "embedding", ["text_id"], unique=True)
@@ -0,0 +1,113 @@
+"""
+Parity and latency of the inference backends against the eager PyTorch one: the cosine similarity between the
+embeddings of the same texts and of the chunks of a long text, the agreement of the search rankings, and the time to
+embed a query. Exits with an error if a backend is not close enough to PyTorch.
+
+    python benchmarks/backend_parity.py --backends torch-int8 onnx onnx-int8
+"""
+import argparse
+import asyncio
+import sys
+import time
+
+import numpy as np
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from spaghettihub.common.db.tables import MyTextTable
+from spaghettihub.common.llm.backends import load_model
+from spaghettihub.common.llm.chunking import split_windows, window_size
+from spaghettihub.common.llm.index import normalize, top_k
+from spaghettihub.common.llm.inference import embed, embed_windows
+from spaghettihub.common.llm.registry import ONNX, ONNX_INT8, TORCH, TORCH_INT8
+
+SAMPLE_TEXTS = [
+    "Machines fail to commission after upgrading to MAAS 3.4",
+    "DHCP snippets are not applied to the rack controller",
+    "Deploying Ubuntu 22.04 on arm64 hangs at the curtin step",
+    "The UI shows a blank page when the region controller is restarted",
+    "Power driver for IPMI times out on Dell servers",
+    "Storage layout with bcache fails on NVMe disks",
+    "Enlistment of virtual machines from LXD does not set the architecture",
+    "Image import gets stuck at 0% with a proxy configured",
+]
+
+
+async def load_texts(dsn: str, size: int) -> list:
+    engine = create_async_engine(dsn)
+    async with engine.connect() as conn:
+        result = await conn.execute(select(MyTextTable.c.content).order_by(func.random()).limit(size))
+        texts = list(result.scalars())
+    await engine.dispose()
+    return texts
+
+
+def embed_all(tokenizer, model, texts: list, batch_size: int) -> np.ndarray:
+    return normalize(np.concatenate([
+        embed(tokenizer, model, texts[i:i + batch_size]) for i in range(0, len(texts), batch_size)
+    ]))
+
+
+def long_text_windows(tokenizer, model, texts: list, overlap: int = 64) -> list:
+    """
+    The windows of the texts joined in a single text a few windows long, as `--chunking` embeds them.
+    """
+    size = window_size(tokenizer, model)
+    token_ids = tokenizer(" ".join(texts), add_special_tokens=False)["input_ids"]
+    token_ids = (token_ids * (3 * size // len(token_ids) + 1))[:3 * size]
+    return split_windows(token_ids, size, overlap, max_windows=32)
+
+
+def query_latency(tokenizer, model, queries: list) -> float:
+    start = time.perf_counter()
+    for query in queries:
+        embed(tokenizer, model, [query])
+    return (time.perf_counter() - start) / len(queries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inference backends parity benchmark")
+    parser.add_argument(
+        "-d", "--dsn", default=None,
+        help="The database DSN to sample the texts from. Without it a few built-in texts are used"
+    )
+    parser.add_argument("-n", "--texts", type=int, default=500, help="Number of texts sampled from the database")
+    parser.add_argument("-b", "--batch-size", type=int, default=16)
+    parser.add_argument("-k", type=int, default=10, help="Number of results compared between the rankings")
+    parser.add_argument("--backends", nargs="+", default=[TORCH_INT8, ONNX, ONNX_INT8])
+    parser.add_argument("--min-cosine", type=float, default=0.99, help="Lowest acceptable cosine to PyTorch")
+    args = parser.parse_args()
+
+    texts = asyncio.run(load_texts(args.dsn, args.texts)) if args.dsn else SAMPLE_TEXTS
+    queries = texts[:min(len(texts), 50)]
+    tokenizer, model = load_model(backend=TORCH)
+    expected = embed_all(tokenizer, model, texts, args.batch_size)
+    windows = long_text_windows(tokenizer, model, texts)
+    expected_windows = normalize(embed_windows(tokenizer, model, windows))
+    print(f"{TORCH}: {query_latency(tokenizer, model, queries) * 1000:.1f} ms/query")
+    k = min(args.k, len(texts))
+
+    failed = False
+    for backend in args.backends:
+        tokenizer, model = load_model(backend=backend)
+        found = embed_all(tokenizer, model, texts, args.batch_size)
+        cosines = np.sum(expected * found, axis=1)
+        window_cosines = np.sum(expected_windows * normalize(embed_windows(tokenizer, model, windows)), axis=1)
+        # Every text is used as a query against all the others.
+        overlap = np.mean([
+            len(set(top_k(expected @ expected[i], k).tolist()) & set(top_k(found @ found[i], k).tolist())) / k
+            for i in range(len(texts))
+        ])
+        latency = query_latency(tokenizer, model, queries)
+        print(
+            f"{backend}: cosine min={cosines.min():.4f} mean={cosines.mean():.4f} top-{k} overlap={overlap:.3f} "
+            f"chunks cosine min={window_cosines.min():.4f} {latency * 1000:.1f} ms/query"
+        )
+        if min(cosines.min(), window_cosines.min()) < args.min_cosine:
+            print(f"{backend}: cosine below {args.min_cosine}")
+            failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
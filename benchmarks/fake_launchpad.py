@@ -0,0 +1,88 @@
+"""
+Local stand-in for the parts of the Launchpad API read by `spaghettihubtraining`, with a configurable latency per
+request. Used by `launchpad_ingestion.py`, or standalone to run the ingestion end to end without network access:
+
+    python benchmarks/fake_launchpad.py --port 8081 --bugs 2000
+    spaghettihubtraining --launchpad-url http://localhost:8081
+"""
+import argparse
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from aiohttp import web
+
+DATE = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def root(request: web.Request) -> str:
+    return f"{request.scheme}://{request.host}"
+
+
+def collection(request: web.Request, entries, default_size: int):
+    start = int(request.query.get("ws.start", 0))
+    size = int(request.query.get("ws.size", default_size))
+    page = {"start": start, "total_size": len(entries), "entries": entries[start:start + size]}
+    if start + size < len(entries):
+        page["next_collection_link"] = root(request) + str(
+            request.rel_url.update_query({"ws.start": start + size, "ws.size": size})
+        )
+    return page
+
+
+def make_app(bugs: int, messages: int, latency: float) -> web.Application:
+    """
+    A project with `bugs` bugs of `messages` messages each. Every tenth bug has a second task, like the bugs targeted
+    to a series.
+    """
+
+    async def delay():
+        if latency:
+            await asyncio.sleep(latency)
+
+    async def search_tasks(request: web.Request):
+        await delay()
+        entries = []
+        for bug_id in range(1, bugs + 1):
+            entries.append({"bug_link": f"{root(request)}/bugs/{bug_id}"})
+            if bug_id % 10 == 0:
+                entries.append({"bug_link": f"{root(request)}/bugs/{bug_id}"})
+        return web.json_response(collection(request, entries, 75))
+
+    async def get_bug(request: web.Request):
+        await delay()
+        bug_id = int(request.match_info["bug_id"])
+        return web.json_response({
+            "id": bug_id,
+            "title": f"Bug {bug_id} title",
+            "description": f"Bug {bug_id} description " * 20,
+            "date_created": DATE.isoformat(),
+            "date_last_updated": (DATE + timedelta(minutes=bug_id)).isoformat(),
+            "web_link": f"https://bugs.launchpad.net/bugs/{bug_id}",
+            "messages_collection_link": f"{root(request)}/bugs/{bug_id}/messages",
+        })
+
+    async def get_messages(request: web.Request):
+        await delay()
+        bug_id = int(request.match_info["bug_id"])
+        entries = [{"content": f"Bug {bug_id} message {i} " * 20} for i in range(messages)]
+        return web.json_response(collection(request, entries, 75))
+
+    app = web.Application()
+    app.router.add_get("/bugs/{bug_id:\\d+}", get_bug)
+    app.router.add_get("/bugs/{bug_id:\\d+}/messages", get_messages)
+    app.router.add_get("/{project}", search_tasks)
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake Launchpad API")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--bugs", type=int, default=1000)
+    parser.add_argument("--messages", type=int, default=5, help="Messages per bug")
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds per request")
+    args = parser.parse_args()
+    web.run_app(make_app(args.bugs, args.messages, args.latency), port=args.port)
+
+
+if __name__ == "__main__":
+    main()
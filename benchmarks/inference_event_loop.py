@@ -0,0 +1,65 @@
+"""
+Event loop lag, i.e. the extra latency of any other request such as a GitHub webhook, while search queries are being
+embedded, with the model running on the event loop and in the inference executor.
+
+    python benchmarks/inference_event_loop.py --searches 32
+"""
+import argparse
+import asyncio
+import time
+
+import numpy as np
+from transformers import AutoModel, AutoTokenizer
+
+from spaghettihub.common.llm.inference import InferenceExecutor, embed
+
+TICK = 0.01
+
+
+async def measure_lag(lags: list) -> None:
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(TICK)
+        lags.append(time.perf_counter() - start - TICK)
+
+
+async def run(searches, embed_query) -> None:
+    lags = []
+    ticker = asyncio.create_task(measure_lag(lags))
+    await asyncio.sleep(TICK)
+    start = time.perf_counter()
+    await asyncio.gather(*[embed_query(search) for search in searches])
+    elapsed = time.perf_counter() - start
+    ticker.cancel()
+    print(
+        f"  {len(searches) / elapsed:.1f} searches/s, event loop lag "
+        f"p50={np.percentile(lags, 50) * 1000:.1f}ms max={max(lags) * 1000:.1f}ms"
+    )
+
+
+async def main(args):
+    tokenizer = AutoTokenizer.from_pretrained(args.model)
+    model = AutoModel.from_pretrained(args.model)
+    searches = [f"machine {i} fails to commission after the upgrade to 3.{i % 5}" for i in range(args.searches)]
+
+    async def inline(search):
+        return embed(tokenizer, model, [search])[0]
+
+    print("on the event loop:")
+    await run(searches, inline)
+
+    executor = InferenceExecutor(
+        lambda contents: embed(tokenizer, model, contents), max_batch_size=args.batch_size,
+        max_queue_size=len(searches), timeout=600
+    )
+    print(f"inference executor, batches of up to {args.batch_size}:")
+    await run(searches, executor.embed)
+    await executor.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Event loop lag during query embeddings")
+    parser.add_argument("-m", "--model", default="BAAI/bge-large-en-v1.5")
+    parser.add_argument("-s", "--searches", type=int, default=32, help="Number of concurrent searches")
+    parser.add_argument("-b", "--batch-size", type=int, default=16)
+    asyncio.run(main(parser.parse_args()))
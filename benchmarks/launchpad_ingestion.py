@@ -0,0 +1,64 @@
+"""
+Throughput of the Launchpad bug ingestion pipeline against the fake Launchpad API, for several numbers of fetchers.
+The database writes are simulated with a fixed cost per batch and per bug. `--fetchers 1 --batch-size 1` is the
+old one bug at a time behaviour.
+
+    python benchmarks/launchpad_ingestion.py --bugs 500 --latency 0.05 --fetchers 1 4 16 64
+"""
+import argparse
+import asyncio
+import time
+
+import aiohttp
+from aiohttp import web
+from fake_launchpad import make_app
+
+from spaghettihub.training.bugs.launchpad import LaunchpadClient
+from spaghettihub.training.bugs.pipeline import BugIngestionPipeline
+
+
+async def ingest(url: str, fetchers: int, batch_size: int, batch_cost: float, bug_cost: float):
+    async def write_batch(bugs):
+        await asyncio.sleep(batch_cost + bug_cost * len(bugs))
+
+    async with aiohttp.ClientSession() as session:
+        client = LaunchpadClient(session, url, concurrency=fetchers)
+        pipeline = BugIngestionPipeline(client, write_batch, fetchers=fetchers, batch_size=batch_size)
+        start = time.perf_counter()
+        written = await pipeline.run([client.search_tasks("maas", ["New"])])
+        return written, time.perf_counter() - start
+
+
+async def run(args):
+    runner = web.AppRunner(make_app(args.bugs, args.messages, args.latency))
+    await runner.setup()
+    site = web.TCPSite(runner, "localhost", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    try:
+        for fetchers in args.fetchers:
+            batch_size = 1 if fetchers == 1 else args.batch_size
+            written, elapsed = await ingest(
+                f"http://localhost:{port}", fetchers, batch_size, args.batch_cost, args.bug_cost
+            )
+            print(f"fetchers={fetchers} batch={batch_size}: {written} bugs in {elapsed:.1f}s "
+                  f"({written / elapsed:.1f} bugs/s)")
+    finally:
+        await runner.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Launchpad ingestion throughput benchmark")
+    parser.add_argument("--bugs", type=int, default=500)
+    parser.add_argument("--messages", type=int, default=5, help="Messages per bug")
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds per Launchpad request")
+    parser.add_argument("--fetchers", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--batch-cost", type=float, default=0.005, help="Seconds per database transaction")
+    parser.add_argument("--bug-cost", type=float, default=0.002, help="Seconds to write a bug")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
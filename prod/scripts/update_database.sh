@@ -1,2 +1,2 @@
-su -c "source ../../ve/bin/activate && spaghettihubmergeproposals && spaghettihubtraining" ubuntu
-service spaghettihubserver restart
\ No newline at end of file
+su -c "source ../../ve/bin/activate && spaghettihubmergeproposals && spaghettihubtraining --snapshot-path ../../embeddings-snapshot" ubuntu
+# No restart: the server loads the new embeddings in its search index every --embeddings-refresh-interval seconds.
@@ -1,25 +1,30 @@
-from typing import List, Optional
+from datetime import datetime
+from typing import Dict, List, Optional
 
-from sqlalchemy import delete, insert, select, update
+from sqlalchemy import delete, insert, select, union_all, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 
 from spaghettihub.common.db.repository import BaseRepository
 from spaghettihub.common.db.sequences import BugCommentSequence
 from spaghettihub.common.db.tables import (BugCommentTable, BugTable,
                                            MyTextTable)
+from spaghettihub.common.db.texts import INSERT_BATCH_SIZE
 from spaghettihub.common.models.base import ListResult, OneToOne
 from spaghettihub.common.models.bugs import Bug, BugComment
 from spaghettihub.common.models.texts import MyText
 
+COMMENT_ID_BLOCK_SIZE = 100
+
 
 class BugsRepository(BaseRepository[Bug]):
     async def get_next_id(self) -> int:
         raise Exception("not implemented")
 
     async def get_next_comment_id(self) -> int:
-        stmt = select(BugCommentSequence.next_value())
-        return (
-            await self.connection_provider.get_current_connection().execute(stmt)
-        ).scalar()
+        return (await self.get_next_comment_ids(1))[0]
+
+    async def get_next_comment_ids(self, size: int) -> List[int]:
+        return await self.allocate_ids(BugCommentSequence, size, COMMENT_ID_BLOCK_SIZE)
 
     async def create(self, entity: Bug) -> Bug:
         stmt = (
@@ -61,60 +66,77 @@ class BugsRepository(BaseRepository[Bug]):
             **bug._asdict()
         )
 
-    async def find_by_text_id(self, id: int) -> Optional[Bug]:
-        title_cte = (
-            select(
-                BugTable.c.id,
-                BugTable.c.title_id,
-                MyTextTable.c.content
-            )
-            .select_from(BugTable)
-            .join(
-                MyTextTable,
-                MyTextTable.c.id == BugTable.c.title_id,
+    async def find_many(self, ids: List[int]) -> Dict[int, Bug]:
+        """
+        The bugs by id, without their texts loaded.
+        """
+        if not ids:
+            return {}
+        stmt = select("*").select_from(BugTable).where(BugTable.c.id.in_(ids))
+        result = await self.connection_provider.get_current_connection().execute(stmt)
+        return {
+            bug.id: Bug(
+                title=OneToOne[MyText](id=bug.title_id),
+                description=OneToOne[MyText](id=bug.description_id),
+                **bug._asdict()
             )
-        ).cte("title_cte")
+            for bug in result.all()
+        }
 
-        description_cte = (
-            select(
-                BugTable.c.id,
-                BugTable.c.description_id,
-                MyTextTable.c.content
-            )
-            .select_from(BugTable)
-            .join(
-                MyTextTable,
-                MyTextTable.c.id == BugTable.c.description_id,
-            )
-        ).cte("description_cte")
+    async def upsert_many(self, entities: List[Bug]) -> None:
+        """
+        Insert the new bugs and update the existing ones with a single multi-row INSERT ... ON CONFLICT.
+        """
+        if not entities:
+            return
+        stmt = pg_insert(BugTable).values(
+            [
+                {
+                    "id": entity.id,
+                    "date_created": entity.date_created,
+                    "date_last_updated": entity.date_last_updated,
+                    "web_link": entity.web_link,
+                    "title_id": entity.title.id,
+                    "description_id": entity.description.id,
+                }
+                for entity in entities
+            ]
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[BugTable.c.id],
+            set_={
+                "date_last_updated": stmt.excluded.date_last_updated,
+                "web_link": stmt.excluded.web_link,
+                "title_id": stmt.excluded.title_id,
+                "description_id": stmt.excluded.description_id,
+            },
+        )
+        await self.connection_provider.get_current_connection().execute(stmt)
 
+    async def find_by_text_id(self, id: int) -> Optional[Bug]:
+        # One indexed lookup per kind of text: an OR across the outer join with the comments can only be served by
+        # scanning both tables.
+        bug_ids = union_all(
+            select(BugTable.c.id).where(BugTable.c.title_id == id),
+            select(BugTable.c.id).where(BugTable.c.description_id == id),
+            select(BugCommentTable.c.bug_id).where(BugCommentTable.c.text_id == id),
+        )
+        title = MyTextTable.alias("title")
+        description = MyTextTable.alias("description")
         stmt = (select(
             BugTable.c.id,
             BugTable.c.date_created,
             BugTable.c.date_last_updated,
             BugTable.c.web_link,
             BugTable.c.title_id,
-            title_cte.c.content.label("title_content"),
+            title.c.content.label("title_content"),
             BugTable.c.description_id,
-            description_cte.c.content.label("description_content")
+            description.c.content.label("description_content")
         )
         .select_from(BugTable)
-        .join(BugCommentTable,
-              BugCommentTable.c.bug_id == BugTable.c.id,
-              isouter=True)
-        .join(
-            title_cte,
-            title_cte.c.id == BugTable.c.id, isouter=True
-        )
-        .join(
-            description_cte,
-            description_cte.c.id == BugTable.c.id, isouter=True
-        )
-        .where(
-            (BugTable.c.title_id == id) |
-            (BugTable.c.description_id == id) |
-            (BugCommentTable.c.text_id == id)
-        )
+        .join(title, title.c.id == BugTable.c.title_id, isouter=True)
+        .join(description, description.c.id == BugTable.c.description_id, isouter=True)
+        .where(BugTable.c.id.in_(bug_ids))
         )
         result = await self.connection_provider.get_current_connection().execute(stmt)
         bug = result.first()
@@ -128,6 +150,61 @@ class BugsRepository(BaseRepository[Bug]):
             **bug._asdict()
         )
 
+    async def find_bug_ids_by_text_ids(self, text_ids: List[int] | None = None) -> Dict[int, int]:
+        """
+        Map the texts (titles, descriptions and comments) to the id of their bug. Without `text_ids`, all the texts are
+        mapped.
+        """
+        titles = select(BugTable.c.title_id.label("text_id"), BugTable.c.id.label("bug_id"))
+        descriptions = select(BugTable.c.description_id.label("text_id"), BugTable.c.id.label("bug_id"))
+        comments = select(BugCommentTable.c.text_id, BugCommentTable.c.bug_id)
+        if text_ids is not None:
+            titles = titles.where(BugTable.c.title_id.in_(text_ids))
+            descriptions = descriptions.where(BugTable.c.description_id.in_(text_ids))
+            comments = comments.where(BugCommentTable.c.text_id.in_(text_ids))
+        stmt = union_all(titles, descriptions, comments)
+        result = await self.connection_provider.get_current_connection().execute(stmt)
+        return {row.text_id: row.bug_id for row in result.all()}
+
+    async def find_last_updated_dates(self) -> Dict[int, datetime]:
+        """
+        The `date_last_updated` of every bug, by id.
+        """
+        stmt = select(BugTable.c.id, BugTable.c.date_last_updated)
+        result = await self.connection_provider.get_current_connection().execute(stmt)
+        return {row.id: row.date_last_updated for row in result.all()}
+
+    async def find_by_ids(self, ids: List[int]) -> List[Bug]:
+        """
+        The bugs with their title and description loaded.
+        """
+        title = MyTextTable.alias("title")
+        description = MyTextTable.alias("description")
+        stmt = (select(
+            BugTable.c.id,
+            BugTable.c.date_created,
+            BugTable.c.date_last_updated,
+            BugTable.c.web_link,
+            BugTable.c.title_id,
+            title.c.content.label("title_content"),
+            BugTable.c.description_id,
+            description.c.content.label("description_content")
+        )
+        .select_from(BugTable)
+        .join(title, title.c.id == BugTable.c.title_id)
+        .join(description, description.c.id == BugTable.c.description_id)
+        .where(BugTable.c.id.in_(ids))
+        )
+        result = await self.connection_provider.get_current_connection().execute(stmt)
+        return [Bug(
+            title=OneToOne[MyText](id=bug.title_id, ref=MyText(
+                id=bug.title_id, content=bug.title_content)),
+            description=OneToOne[MyText](id=bug.description_id, ref=MyText(
+                id=bug.description_id, content=bug.description_content)),
+            **bug._asdict()
+        ) for bug in result.all()
+        ]
+
     async def list(self, size: int, page: int) -> ListResult[Bug]:
         pass
 
@@ -156,6 +233,48 @@ class BugsRepository(BaseRepository[Bug]):
             delete(BugCommentTable).where(BugCommentTable.c.bug_id == id)
         )
 
+    async def find_comment_text_ids(self, bug_id: int) -> List[int]:
+        """
+        The texts of the comments of the bug, in creation order.
+        """
+        stmt = (
+            select(BugCommentTable.c.text_id)
+            .where(BugCommentTable.c.bug_id == bug_id)
+            .order_by(BugCommentTable.c.id)
+        )
+        result = await self.connection_provider.get_current_connection().execute(stmt)
+        return list(result.scalars())
+
+    async def find_comments_text_ids(self, bug_ids: List[int]) -> Dict[int, List[int]]:
+        """
+        The texts of the comments of all the bugs, in creation order. Bugs without comments are omitted.
+        """
+        if not bug_ids:
+            return {}
+        stmt = (
+            select(BugCommentTable.c.bug_id, BugCommentTable.c.text_id)
+            .where(BugCommentTable.c.bug_id.in_(bug_ids))
+            .order_by(BugCommentTable.c.id)
+        )
+        result = await self.connection_provider.get_current_connection().execute(stmt)
+        text_ids = {}
+        for row in result.all():
+            text_ids.setdefault(row.bug_id, []).append(row.text_id)
+        return text_ids
+
+    async def add_comments(self, entities: List[BugComment]) -> None:
+        """
+        Insert all the comments with multi-row INSERTs.
+        """
+        for i in range(0, len(entities), INSERT_BATCH_SIZE):
+            stmt = insert(BugCommentTable).values(
+                [
+                    {"id": entity.id, "text_id": entity.text.id, "bug_id": entity.bug.id}
+                    for entity in entities[i:i + INSERT_BATCH_SIZE]
+                ]
+            )
+            await self.connection_provider.get_current_connection().execute(stmt)
+
     async def add_comment(self, entity: BugComment) -> BugComment:
         stmt = (
             insert(BugCommentTable)
@@ -197,3 +316,34 @@ class BugsRepository(BaseRepository[Bug]):
             **bug_comment._asdict()
         ) for bug_comment in result.all()
         ]
+
+    async def find_bugs_comments(self, bug_ids: List[int]) -> Dict[int, List[BugComment]]:
+        """
+        The comments of all the bugs, in creation order. Bugs without comments are omitted.
+        """
+        stmt = (select(
+            BugCommentTable.c.id,
+            BugCommentTable.c.text_id,
+            BugCommentTable.c.bug_id,
+            MyTextTable.c.content
+        )
+        .select_from(BugCommentTable)
+        .join(
+            MyTextTable,
+            MyTextTable.c.id == BugCommentTable.c.text_id
+        )
+        .where(
+            BugCommentTable.c.bug_id.in_(bug_ids),
+        )
+        .order_by(BugCommentTable.c.id)
+        )
+        result = await self.connection_provider.get_current_connection().execute(stmt)
+        comments = {}
+        for bug_comment in result.all():
+            comments.setdefault(bug_comment.bug_id, []).append(BugComment(
+                text=OneToOne[MyText](id=bug_comment.text_id, ref=MyText(id=bug_comment.text_id,
+                                                                         content=bug_comment.content)),
+                bug=OneToOne[Bug](id=bug_comment.bug_id),
+                **bug_comment._asdict()
+            ))
+        return comments
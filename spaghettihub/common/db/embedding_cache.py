@@ -0,0 +1,56 @@
+from typing import Dict, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+
+from spaghettihub.common.db.repository import BaseRepository
+from spaghettihub.common.db.tables import EmbeddingCacheTable
+from spaghettihub.common.models.base import ListResult
+from spaghettihub.common.models.embeddings import CachedEmbedding
+
+
+class EmbeddingCacheRepository(BaseRepository[CachedEmbedding]):
+    async def get_next_id(self) -> int:
+        raise Exception("not implemented")
+
+    async def create(self, entity: CachedEmbedding) -> CachedEmbedding:
+        await self.create_many([entity])
+        return entity
+
+    async def create_many(self, entities: List[CachedEmbedding]) -> None:
+        """
+        Concurrent writers compute the same embedding for the same key: the first one wins.
+        """
+        if not entities:
+            return
+        stmt = (
+            insert(EmbeddingCacheTable)
+            .values([entity.dict() for entity in entities])
+            .on_conflict_do_nothing()
+        )
+        await self.connection_provider.get_current_connection().execute(stmt)
+
+    async def find_by_id(self, id: int) -> Optional[CachedEmbedding]:
+        raise Exception("not implemented")
+
+    async def find_many(self, model: str, content_hashes: List[str]) -> Dict[str, bytes]:
+        if not content_hashes:
+            return {}
+        stmt = (
+            select(EmbeddingCacheTable.c.content_hash, EmbeddingCacheTable.c.embedding)
+            .where(
+                EmbeddingCacheTable.c.model == model,
+                EmbeddingCacheTable.c.content_hash.in_(content_hashes)
+            )
+        )
+        result = await self.connection_provider.get_current_connection().execute(stmt)
+        return {row.content_hash: row.embedding for row in result.all()}
+
+    async def list(self, size: int, page: int) -> ListResult[CachedEmbedding]:
+        pass
+
+    async def update(self, entity: CachedEmbedding) -> CachedEmbedding:
+        pass
+
+    async def delete(self, id: int) -> None:
+        pass
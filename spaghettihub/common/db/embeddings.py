@@ -1,22 +1,21 @@
-from typing import Optional
+from typing import AsyncIterator, List, Optional, Tuple
 
-from sqlalchemy import delete, desc, insert, select
+from sqlalchemy import delete, desc, func, insert, select
 from sqlalchemy.sql.functions import count
 
+from spaghettihub.common.db.pagination import (decode_cursor, estimated_count,
+                                               page_and_cursor)
 from spaghettihub.common.db.repository import BaseRepository
-from spaghettihub.common.db.sequences import EmbeddingSequence
-from spaghettihub.common.db.tables import EmbeddingTable
+from spaghettihub.common.db.sequences import (EmbeddingChunkSequence,
+                                              EmbeddingSequence)
+from spaghettihub.common.db.tables import EmbeddingChunkTable, EmbeddingTable
 from spaghettihub.common.models.base import ListResult, OneToOne
-from spaghettihub.common.models.embeddings import Embedding
+from spaghettihub.common.models.embeddings import Embedding, EmbeddingChunk
 from spaghettihub.common.models.texts import MyText
 
 
 class EmbeddingsRepository(BaseRepository[Embedding]):
-    async def get_next_id(self) -> int:
-        stmt = select(EmbeddingSequence.next_value())
-        return (
-            await self.connection_provider.get_current_connection().execute(stmt)
-        ).scalar()
+    sequence = EmbeddingSequence
 
     async def create(self, entity: Embedding) -> Embedding:
         stmt = (
@@ -25,8 +24,9 @@ class EmbeddingsRepository(BaseRepository[Embedding]):
                 EmbeddingTable.c.id,
                 EmbeddingTable.c.text_id,
                 EmbeddingTable.c.embedding,
+                EmbeddingTable.c.model,
             )
-            .values(id=entity.id, text_id=entity.text.id, embedding=entity.embedding)
+            .values(id=entity.id, text_id=entity.text.id, embedding=entity.embedding, model=entity.model)
         )
         result = await self.connection_provider.get_current_connection().execute(stmt)
         embedding = result.one()
@@ -35,6 +35,20 @@ class EmbeddingsRepository(BaseRepository[Embedding]):
             **embedding._asdict()
         )
 
+    async def create_many(self, entities: List[Embedding]) -> None:
+        """
+        Insert all the embeddings with a single multi-row INSERT.
+        """
+        if not entities:
+            return
+        stmt = insert(EmbeddingTable).values(
+            [
+                {"id": entity.id, "text_id": entity.text.id, "embedding": entity.embedding, "model": entity.model}
+                for entity in entities
+            ]
+        )
+        await self.connection_provider.get_current_connection().execute(stmt)
+
     async def find_by_id(self, id: int) -> Optional[Embedding]:
         stmt = select(
             "*").select_from(EmbeddingTable).where(EmbeddingTable.c.id == id)
@@ -47,29 +61,174 @@ class EmbeddingsRepository(BaseRepository[Embedding]):
             **embedding._asdict()
         )
 
-    async def list(self, size: int, page: int) -> ListResult[Embedding]:
-        total_stmt = select(count()).select_from(EmbeddingTable)
-        total = (await self.connection_provider.get_current_connection().execute(total_stmt)).scalar()
+    async def list(self, size: int, page: int, cursor: str | None = None) -> ListResult[Embedding]:
+        """
+        More recent embeddings first. With a `cursor` the page is found with a seek on the primary key and `page` is
+        ignored. The total is an estimate.
+        """
+        connection = self.connection_provider.get_current_connection()
+        total = await estimated_count(connection, EmbeddingTable)
 
         stmt = (
             select("*")
             .select_from(EmbeddingTable)
             .order_by(desc(EmbeddingTable.c.id))
-            .offset((page - 1) * size)
-            .limit(size)
+            .limit(size + 1)
         )
+        if cursor is not None:
+            id, = decode_cursor(cursor, int)
+            stmt = stmt.where(EmbeddingTable.c.id < id)
+        else:
+            stmt = stmt.offset((page - 1) * size)
 
-        result = await self.connection_provider.get_current_connection().execute(stmt)
+        result = await connection.execute(stmt)
+        rows, next_cursor = page_and_cursor(result.all(), size, lambda row: (row.id,))
         return ListResult[Embedding](
             items=[
                 Embedding(
                     text=OneToOne[MyText](id=row.text_id),
                     **row._asdict()
                 )
-                for row in result.all()
+                for row in rows
             ],
-            total=total
+            total=total,
+            next_cursor=next_cursor
+        )
+
+    async def get_size_and_max_id(self, model: str) -> Tuple[int, int]:
+        stmt = (
+            select(count(), func.coalesce(func.max(EmbeddingTable.c.id), 0))
+            .select_from(EmbeddingTable)
+            .where(EmbeddingTable.c.model == model)
+        )
+        result = await self.connection_provider.get_current_connection().execute(stmt)
+        return tuple(result.one())
+
+    async def list_text_ids(self, model: str) -> List[int]:
+        stmt = select(EmbeddingTable.c.text_id).select_from(EmbeddingTable).where(EmbeddingTable.c.model == model)
+        result = await self.connection_provider.get_current_connection().execute(stmt)
+        return list(result.scalars())
+
+    async def find_all(self, model: str) -> List[Embedding]:
+        stmt = (
+            select("*")
+            .select_from(EmbeddingTable)
+            .where(EmbeddingTable.c.model == model)
         )
+        result = await self.connection_provider.get_current_connection().execute(stmt)
+        return [
+            Embedding(
+                text=OneToOne[MyText](id=row.text_id),
+                **row._asdict()
+            )
+            for row in result.all()
+        ]
+
+    async def find_by_text_ids(self, text_ids: List[int], model: str) -> List[Embedding]:
+        if not text_ids:
+            return []
+        stmt = (
+            select("*")
+            .select_from(EmbeddingTable)
+            .where(EmbeddingTable.c.model == model, EmbeddingTable.c.text_id.in_(text_ids))
+        )
+        result = await self.connection_provider.get_current_connection().execute(stmt)
+        return [
+            Embedding(
+                text=OneToOne[MyText](id=row.text_id),
+                **row._asdict()
+            )
+            for row in result.all()
+        ]
+
+    async def stream(self, until_id: int, batch_size: int, model: str) -> AsyncIterator[List[Embedding]]:
+        """
+        Read the embeddings of `model` up to `until_id` in batches of `batch_size` rows through a server side cursor,
+        oldest first. Must run in a transaction.
+        """
+        stmt = (
+            select("*")
+            .select_from(EmbeddingTable)
+            .where(EmbeddingTable.c.model == model, EmbeddingTable.c.id <= until_id)
+            .order_by(EmbeddingTable.c.id)
+        )
+        result = await self.connection_provider.get_current_connection().stream(stmt)
+        async for rows in result.partitions(batch_size):
+            yield [
+                Embedding(
+                    text=OneToOne[MyText](id=row.text_id),
+                    **row._asdict()
+                )
+                for row in rows
+            ]
+
+    async def get_next_chunk_ids(self, size: int) -> List[int]:
+        return await self.allocate_ids(EmbeddingChunkSequence, size)
+
+    async def create_chunks(self, entities: List[EmbeddingChunk]) -> None:
+        if not entities:
+            return
+        stmt = insert(EmbeddingChunkTable).values(
+            [
+                {
+                    "id": entity.id,
+                    "text_id": entity.text.id,
+                    "position": entity.position,
+                    "embedding": entity.embedding,
+                    "model": entity.model
+                }
+                for entity in entities
+            ]
+        )
+        await self.connection_provider.get_current_connection().execute(stmt)
+
+    async def get_chunks_size(self, model: str) -> int:
+        stmt = select(count()).select_from(EmbeddingChunkTable).where(EmbeddingChunkTable.c.model == model)
+        result = await self.connection_provider.get_current_connection().execute(stmt)
+        return result.scalar()
+
+    async def stream_chunks(self, batch_size: int, model: str) -> AsyncIterator[List[EmbeddingChunk]]:
+        """
+        Read the chunks of `model` in batches of `batch_size` rows through a server side cursor, in no particular
+        order. Must run in a transaction.
+        """
+        stmt = (
+            select("*")
+            .select_from(EmbeddingChunkTable)
+            .where(EmbeddingChunkTable.c.model == model)
+        )
+        result = await self.connection_provider.get_current_connection().stream(stmt)
+        async for rows in result.partitions(batch_size):
+            yield [
+                EmbeddingChunk(
+                    text=OneToOne[MyText](id=row.text_id),
+                    **row._asdict()
+                )
+                for row in rows
+            ]
+
+    async def find_chunks(self, model: str, text_ids: List[int] | None = None) -> List[EmbeddingChunk]:
+        """
+        The chunks of `model` of the given texts, or of all the texts.
+        """
+        stmt = (
+            select("*")
+            .select_from(EmbeddingChunkTable)
+            .where(EmbeddingChunkTable.c.model == model)
+            .order_by(EmbeddingChunkTable.c.id)
+        )
+        if text_ids is not None:
+            if not text_ids:
+                return []
+            stmt = stmt.where(EmbeddingChunkTable.c.text_id.in_(text_ids))
+        result = await self.connection_provider.get_current_connection().execute(stmt)
+        return [
+            EmbeddingChunk(
+                text=OneToOne[MyText](id=row.text_id),
+                **row._asdict()
+            )
+            for row in result.all()
+        ]
 
     async def update(self, entity: Embedding) -> Embedding:
         pass
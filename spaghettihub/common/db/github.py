@@ -3,18 +3,15 @@ from typing import Optional
 from sqlalchemy import delete, insert, select, update
 
 from spaghettihub.common.db.repository import BaseRepository
-from spaghettihub.common.db.sequences import (LaunchpadToGithubWorkSequence)
-from spaghettihub.common.db.tables import (LaunchpadToGithubWorkTable)
+from spaghettihub.common.db.sequences import LaunchpadToGithubWorkSequence
+from spaghettihub.common.db.tables import LaunchpadToGithubWorkTable
 from spaghettihub.common.models.base import ListResult
 from spaghettihub.common.models.github import LaunchpadToGithubWork
 
 
 class LaunchpadToGithubWorkRepository(BaseRepository[LaunchpadToGithubWork]):
-    async def get_next_id(self) -> int:
-        stmt = select(LaunchpadToGithubWorkSequence.next_value())
-        return (
-            await self.connection_provider.get_current_connection().execute(stmt)
-        ).scalar()
+    sequence = LaunchpadToGithubWorkSequence
+    id_block_size = 100
 
     async def create(self, entity: LaunchpadToGithubWork) -> LaunchpadToGithubWork:
         stmt = (
@@ -1,25 +1,26 @@
+from datetime import datetime
 from typing import Optional
 
-from sqlalchemy import delete, insert, select, update, desc
+from sqlalchemy import delete, desc, insert, select, update
 from sqlalchemy.sql.functions import count
 
+from spaghettihub.common.db.pagination import (after_descending, decode_cursor,
+                                               estimated_count,
+                                               page_and_cursor)
 from spaghettihub.common.db.repository import BaseRepository, T
-from spaghettihub.common.db.sequences import (MAASSequence)
-from spaghettihub.common.db.tables import (MAASTable)
+from spaghettihub.common.db.sequences import MAASSequence
+from spaghettihub.common.db.tables import MAASTable
 from spaghettihub.common.models.base import ListResult
 from spaghettihub.common.models.maas import MAAS
 
 
 class MAASRepository(BaseRepository[MAAS]):
+    sequence = MAASSequence
+    id_block_size = 100
+
     async def list(self, size: int, page: int) -> ListResult[MAAS]:
         pass
 
-    async def get_next_id(self) -> int:
-        stmt = select(MAASSequence.next_value())
-        return (
-            await self.connection_provider.get_current_connection().execute(stmt)
-        ).scalar()
-
     async def create(self, entity: MAAS) -> MAAS:
         stmt = (
             insert(MAASTable)
@@ -48,27 +49,45 @@ class MAASRepository(BaseRepository[MAAS]):
             return None
         return MAAS(**maas._asdict())
 
-    async def list_commits(self, query: str | None, page: int, size: int) -> ListResult[MAAS]:
-        total_stmt = select(count()).select_from(MAASTable)
-        if query:
-            total_stmt = total_stmt.where(MAASTable.c.commit_sha.like("%" + query + "%"))
-        total = (await self.connection_provider.get_current_connection().execute(total_stmt)).scalar()
+    async def list_commits(
+            self, query: str | None, page: int, size: int, cursor: str | None = None
+    ) -> ListResult[MAAS]:
+        """
+        More recent commits first. With a `cursor` the page is found with a seek on (commit_date, id) and `page` is
+        ignored. The total is estimated when there is no query, and it is only counted for the first page otherwise.
+        """
+        connection = self.connection_provider.get_current_connection()
+        condition = MAASTable.c.commit_sha.like("%" + query + "%") if query else None
+
+        if condition is None:
+            total = await estimated_count(connection, MAASTable)
+        elif cursor is None:
+            total = (await connection.execute(select(count()).select_from(MAASTable).where(condition))).scalar()
+        else:
+            total = None
 
         stmt = (
             select("*")
             .select_from(MAASTable)
-            .order_by(desc(MAASTable.c.commit_date))
-            .offset((page - 1) * size)
-            .limit(size)
+            .order_by(desc(MAASTable.c.commit_date), desc(MAASTable.c.id))
+            .limit(size + 1)
         )
-        if query:
-            stmt = stmt.where(MAASTable.c.commit_sha.like("%" + query + "%"))
+        if condition is not None:
+            stmt = stmt.where(condition)
+        if cursor is not None:
+            commit_date, id = decode_cursor(cursor, datetime, int)
+            stmt = stmt.where(after_descending(MAASTable.c.commit_date, MAASTable.c.id, commit_date, id))
+        else:
+            stmt = stmt.offset((page - 1) * size)
 
-        result = await self.connection_provider.get_current_connection().execute(stmt)
+        result = await connection.execute(stmt)
+        rows, next_cursor = page_and_cursor(result.all(), size, lambda row: (row.commit_date, row.id))
         return ListResult[MAAS](
-            items=[MAAS(**row._asdict()) for row in result.all()],
-            total=total
+            items=[MAAS(**row._asdict()) for row in rows],
+            total=total,
+            next_cursor=next_cursor
         )
+
     async def update(self, entity: MAAS) -> MAAS:
         stmt = (
             update(MAASTable)
@@ -1,35 +1,42 @@
-from typing import Optional
+from datetime import datetime
+from typing import Dict, List, Optional
 
-from sqlalchemy import delete, desc, insert, select
+from sqlalchemy import delete, desc, func, insert, select, union_all
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.sql.functions import count
 
+from spaghettihub.common.db.pagination import (InvalidCursor, after_descending,
+                                               decode_cursor, page_and_cursor)
 from spaghettihub.common.db.repository import BaseRepository
-from spaghettihub.common.db.sequences import (MergeProposalsSequence)
-from spaghettihub.common.db.tables import (MergeProposalTable)
-from spaghettihub.common.models.base import ListResult
-from spaghettihub.common.models.merge_proposals import MergeProposal
+from spaghettihub.common.db.sequences import MergeProposalsSequence
+from spaghettihub.common.db.tables import MergeProposalTable
+from spaghettihub.common.models.base import ListResult, OneToOne
+from spaghettihub.common.models.merge_proposals import (
+    MergeProposal, MergeProposalSearchOrder)
 from spaghettihub.common.models.texts import MyText
 
+# Everything but the search vector, that is only meant for the database.
+MERGE_PROPOSAL_COLUMNS = (
+    MergeProposalTable.c.id,
+    MergeProposalTable.c.commit_message,
+    MergeProposalTable.c.date_merged,
+    MergeProposalTable.c.source_git_path,
+    MergeProposalTable.c.target_git_path,
+    MergeProposalTable.c.registrant_name,
+    MergeProposalTable.c.web_link,
+    MergeProposalTable.c.description,
+)
+TEXT_SEARCH_CONFIG = "english"
+
 
 class MergeProposalsRepository(BaseRepository[MergeProposal]):
-    async def get_next_id(self) -> int:
-        stmt = select(MergeProposalsSequence.next_value())
-        return (
-            await self.connection_provider.get_current_connection().execute(stmt)
-        ).scalar()
+    sequence = MergeProposalsSequence
+    id_block_size = 100
 
     async def create(self, entity: MergeProposal) -> MergeProposal:
         stmt = (
             insert(MergeProposalTable)
-            .returning(
-                MergeProposalTable.c.id,
-                MergeProposalTable.c.commit_message,
-                MergeProposalTable.c.date_merged,
-                MergeProposalTable.c.source_git_path,
-                MergeProposalTable.c.target_git_path,
-                MergeProposalTable.c.registrant_name,
-                MergeProposalTable.c.web_link,
-            )
+            .returning(*MERGE_PROPOSAL_COLUMNS)
             .values(
                 id=entity.id,
                 commit_message=entity.commit_message,
@@ -44,37 +51,172 @@ class MergeProposalsRepository(BaseRepository[MergeProposal]):
         text = result.one()
         return MergeProposal(**text._asdict())
 
+    async def upsert_many(self, entities: List[MergeProposal]) -> None:
+        """
+        Insert the MPs with a single multi-row INSERT. An MP already stored, with the same web link, is updated
+        instead and keeps its id.
+        """
+        if not entities:
+            return
+        stmt = pg_insert(MergeProposalTable).values(
+            [
+                {
+                    "id": entity.id,
+                    "commit_message": entity.commit_message,
+                    "date_merged": entity.date_merged,
+                    "source_git_path": entity.source_git_path,
+                    "target_git_path": entity.target_git_path,
+                    "registrant_name": entity.registrant_name,
+                    "web_link": entity.web_link,
+                    "description": entity.description,
+                    "commit_message_text_id": entity.commit_message_text.id if entity.commit_message_text else None,
+                    "description_text_id": entity.description_text.id if entity.description_text else None,
+                }
+                for entity in entities
+            ]
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[MergeProposalTable.c.web_link],
+            set_={
+                "commit_message": stmt.excluded.commit_message,
+                "date_merged": stmt.excluded.date_merged,
+                "source_git_path": stmt.excluded.source_git_path,
+                "target_git_path": stmt.excluded.target_git_path,
+                "registrant_name": stmt.excluded.registrant_name,
+                "description": stmt.excluded.description,
+                "commit_message_text_id": stmt.excluded.commit_message_text_id,
+                "description_text_id": stmt.excluded.description_text_id,
+            },
+        )
+        await self.connection_provider.get_current_connection().execute(stmt)
+
     async def find_by_id(self, id: int) -> Optional[MergeProposal]:
-        stmt = select(
-            "*").select_from(MergeProposalTable).where(MergeProposalTable.c.id == id)
+        stmt = select(*MERGE_PROPOSAL_COLUMNS).where(MergeProposalTable.c.id == id)
         result = await self.connection_provider.get_current_connection().execute(stmt)
         text = result.first()
         if not text:
             return None
         return MergeProposal(**text._asdict())
 
-    async def find_by_commit_message_match(self, message: str, page: int, size: int) -> ListResult[MergeProposal]:
+    async def find_by_ids(self, ids: List[int]) -> List[MergeProposal]:
+        stmt = select(*MERGE_PROPOSAL_COLUMNS).where(MergeProposalTable.c.id.in_(ids))
+        result = await self.connection_provider.get_current_connection().execute(stmt)
+        return [MergeProposal(**row._asdict()) for row in result.all()]
+
+    async def find_by_web_links(self, web_links: List[str]) -> Dict[str, MergeProposal]:
+        """
+        The MPs by web link, with the ids of their texts.
+        """
+        if not web_links:
+            return {}
+        stmt = (
+            select(
+                *MERGE_PROPOSAL_COLUMNS,
+                MergeProposalTable.c.commit_message_text_id,
+                MergeProposalTable.c.description_text_id,
+            )
+            .where(MergeProposalTable.c.web_link.in_(web_links))
+        )
+        result = await self.connection_provider.get_current_connection().execute(stmt)
+        merge_proposals = {}
+        for row in result.all():
+            row = row._asdict()
+            commit_message_text_id = row.pop("commit_message_text_id")
+            description_text_id = row.pop("description_text_id")
+            merge_proposals[row["web_link"]] = MergeProposal(
+                commit_message_text=OneToOne[MyText](id=commit_message_text_id) if commit_message_text_id else None,
+                description_text=OneToOne[MyText](id=description_text_id) if description_text_id else None,
+                **row
+            )
+        return merge_proposals
+
+    async def find_merge_proposal_ids_by_text_ids(self, text_ids: List[int] | None = None) -> Dict[int, int]:
+        """
+        Map the texts (commit messages and descriptions) to the id of their MP. Without `text_ids`, all the texts are
+        mapped.
+        """
+        commit_messages = select(
+            MergeProposalTable.c.commit_message_text_id.label("text_id"), MergeProposalTable.c.id
+        ).where(MergeProposalTable.c.commit_message_text_id.is_not(None))
+        descriptions = select(
+            MergeProposalTable.c.description_text_id.label("text_id"), MergeProposalTable.c.id
+        ).where(MergeProposalTable.c.description_text_id.is_not(None))
+        if text_ids is not None:
+            commit_messages = commit_messages.where(MergeProposalTable.c.commit_message_text_id.in_(text_ids))
+            descriptions = descriptions.where(MergeProposalTable.c.description_text_id.in_(text_ids))
+        stmt = union_all(commit_messages, descriptions)
+        result = await self.connection_provider.get_current_connection().execute(stmt)
+        return {row.text_id: row.id for row in result.all()}
+
+    async def find_by_commit_message_match(
+            self, message: str, page: int, size: int, cursor: str | None = None
+    ) -> ListResult[MergeProposal]:
         """
         More recent MPs first.
         """
+        return await self._find_page(
+            MergeProposalTable.c.commit_message.like("%" + message + "%"), page, size, cursor
+        )
 
-        total_stmt = select(count()).select_from(MergeProposalTable).where(
-            MergeProposalTable.c.commit_message.like("%" + message + "%"))
-        total = (await self.connection_provider.get_current_connection().execute(total_stmt)).scalar()
+    async def find_by_commit_message_search(
+            self, query: str, order: MergeProposalSearchOrder, page: int, size: int, cursor: str | None = None
+    ) -> ListResult[MergeProposal]:
+        """
+        Full text search on the commit messages, served by the GIN index on `commit_message_tsv`. `query` uses the web
+        search syntax: quoted phrases, `or` and `-excluded` words.
+        """
+        tsquery = func.websearch_to_tsquery(TEXT_SEARCH_CONFIG, query)
+        condition = MergeProposalTable.c.commit_message_tsv.bool_op("@@")(tsquery)
+        if order == MergeProposalSearchOrder.RELEVANCE:
+            return await self._find_page(
+                condition, page, size, cursor, rank=func.ts_rank(MergeProposalTable.c.commit_message_tsv, tsquery)
+            )
+        return await self._find_page(condition, page, size, cursor)
 
+    async def _find_page(self, condition, page: int, size: int, cursor: str | None, rank=None) -> ListResult[MergeProposal]:
+        """
+        The MPs matching `condition`, by `rank` or more recent first. Without a rank, a `cursor` seeks the page on
+        (date_merged, id) instead of skipping `page` pages. With a rank, which is computed on the fly and cannot be
+        sought, the cursor holds the offset of the page. The total is only counted for the first page.
+        """
+        connection = self.connection_provider.get_current_connection()
+        total = None
+        if cursor is None:
+            total_stmt = select(count()).select_from(MergeProposalTable).where(condition)
+            total = (await connection.execute(total_stmt)).scalar()
+
+        order_by = (desc(MergeProposalTable.c.date_merged), desc(MergeProposalTable.c.id))
+        if rank is not None:
+            order_by = (desc(rank),) + order_by
         stmt = (
-            select("*")
-            .select_from(MergeProposalTable)
-            .where(MergeProposalTable.c.commit_message.like("%" + message + "%"))
-            .order_by(desc(MergeProposalTable.c.date_merged))
-            .offset((page - 1) * size)
-            .limit(size)
+            select(*MERGE_PROPOSAL_COLUMNS)
+            .where(condition)
+            .order_by(*order_by)
+            .limit(size + 1)
         )
+        offset = (page - 1) * size
+        if cursor is not None and rank is None:
+            date_merged, id = decode_cursor(cursor, datetime, int)
+            stmt = stmt.where(
+                after_descending(MergeProposalTable.c.date_merged, MergeProposalTable.c.id, date_merged, id)
+            )
+            offset = 0
+        elif cursor is not None:
+            offset, = decode_cursor(cursor, int)
+            if offset < 0:
+                raise InvalidCursor(f"Invalid cursor: {cursor}")
+        if offset:
+            stmt = stmt.offset(offset)
 
-        result = await self.connection_provider.get_current_connection().execute(stmt)
+        result = await connection.execute(stmt)
+        if rank is not None:
+            rows, next_cursor = page_and_cursor(result.all(), size, lambda row: (offset + size,))
+        else:
+            rows, next_cursor = page_and_cursor(result.all(), size, lambda row: (row.date_merged, row.id))
         return ListResult[MergeProposal](
-            items=[MergeProposal(**row._asdict()) for row in result.all()],
-            total=total
+            items=[MergeProposal(**row._asdict()) for row in rows],
+            total=total,
+            next_cursor=next_cursor
         )
 
     async def list(self, size: int, page: int) -> ListResult[MergeProposal]:
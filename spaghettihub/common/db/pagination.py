@@ -0,0 +1,78 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Optional, Sequence, Tuple
+
+from sqlalchemy import (BigInteger, ColumnElement, Table, and_, cast, column,
+                        literal, or_, select, table, tuple_)
+from sqlalchemy.dialects.postgresql import REGCLASS
+from sqlalchemy.ext.asyncio import AsyncConnection
+from sqlalchemy.sql.functions import count
+
+
+class InvalidCursor(ValueError):
+    """ The pagination cursor was not produced by `encode_cursor` """
+
+
+def encode_cursor(*values: Any) -> str:
+    """
+    Opaque token holding the sort key of the last row of a page. The next page starts right after it.
+    """
+    payload = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+
+def decode_cursor(cursor: str, *types: type) -> Tuple[Any, ...]:
+    """
+    The sort key in `cursor`, converted to `types`. Any value can be None.
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if not isinstance(values, list) or len(values) != len(types):
+            raise ValueError("Unexpected number of values")
+        decoded = []
+        for value, value_type in zip(values, types):
+            if value is None:
+                decoded.append(None)
+            elif value_type is datetime:
+                decoded.append(datetime.fromisoformat(value))
+            elif isinstance(value, value_type):
+                decoded.append(value)
+            else:
+                raise ValueError(f"Expected {value_type.__name__}")
+        return tuple(decoded)
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor(f"Invalid cursor: {cursor}") from e
+
+
+def after_descending(sort_column: ColumnElement, id_column: ColumnElement, value: Any, id: int) -> ColumnElement:
+    """
+    The rows after (`value`, `id`) in `ORDER BY sort_column DESC, id_column DESC`, where NULLs come first. The row
+    value comparison is what lets postgres seek into an index on (sort_column, id_column).
+    """
+    if value is None:
+        return or_(and_(sort_column.is_(None), id_column < id), sort_column.is_not(None))
+    return tuple_(sort_column, id_column) < tuple_(literal(value, sort_column.type), literal(id, id_column.type))
+
+
+def page_and_cursor(rows: Sequence, size: int, key) -> Tuple[Sequence, Optional[str]]:
+    """
+    Split the `size + 1` rows fetched for a page into the page and the cursor of the next one, if there is one.
+    """
+    if len(rows) <= size:
+        return rows, None
+    rows = rows[:size]
+    return rows, encode_cursor(*key(rows[-1]))
+
+
+async def estimated_count(connection: AsyncConnection, target: Table) -> int:
+    """
+    Number of rows in `target` as estimated by the planner statistics, without scanning the table. Tables that were
+    never analyzed are counted.
+    """
+    pg_class = table("pg_class", column("oid"), column("reltuples"))
+    stmt = select(cast(pg_class.c.reltuples, BigInteger)).where(pg_class.c.oid == cast(literal(target.name), REGCLASS))
+    estimate = (await connection.execute(stmt)).scalar()
+    if estimate is None or estimate < 0:
+        estimate = (await connection.execute(select(count()).select_from(target))).scalar()
+    return estimate
@@ -1,19 +1,52 @@
 from abc import ABC, abstractmethod
-from typing import Generic, Optional, TypeVar
+from collections import defaultdict, deque
+from typing import Deque, Dict, Generic, List, Optional, Tuple, TypeVar
+
+from sqlalchemy import Sequence, func, select
 
 from spaghettihub.common.db.base import ConnectionProvider
 from spaghettihub.common.models.base import ListResult
 
 T = TypeVar("T")
 
+# The ids reserved by the process and not used yet, by database and sequence.
+RESERVED_IDS: Dict[Tuple[str, str], Deque[int]] = defaultdict(deque)
+
 
 class BaseRepository(ABC, Generic[T]):
+    # The sequence of the ids of the entities, and how many ids `get_next_id` reserves at once. A block of ids costs a
+    # single round-trip, but the ids are not in insertion order anymore: the repositories whose rows are read back by
+    # id, like the embeddings, reserve one at a time.
+    sequence: Sequence | None = None
+    id_block_size: int = 1
+
     def __init__(self, connection_provider: ConnectionProvider):
         self.connection_provider = connection_provider
 
-    @abstractmethod
     async def get_next_id(self) -> int:
-        pass
+        if self.sequence is None:
+            raise Exception("not implemented")
+        return (await self.allocate_ids(self.sequence, 1, self.id_block_size))[0]
+
+    async def get_next_ids(self, size: int) -> List[int]:
+        if self.sequence is None:
+            raise Exception("not implemented")
+        return await self.allocate_ids(self.sequence, size, self.id_block_size)
+
+    async def allocate_ids(self, sequence: Sequence, size: int, block_size: int = 1) -> List[int]:
+        """
+        `size` ids of `sequence`, taken from the ones the process reserved before. When there are not enough left, at
+        least `block_size` more are reserved with a single `nextval` over `generate_series`.
+
+        The ids reserved and never used are lost, as the ones of a rolled back transaction: there are gaps anyway.
+        """
+        connection = self.connection_provider.get_current_connection()
+        reserved = RESERVED_IDS[(str(connection.engine.url), sequence.name)]
+        while len(reserved) < size:
+            count = max(size - len(reserved), block_size)
+            stmt = select(sequence.next_value()).select_from(func.generate_series(1, count))
+            reserved.extend((await connection.execute(stmt)).scalars())
+        return [reserved.popleft() for _ in range(size)]
 
     @abstractmethod
     async def create(self, entity: T) -> T:
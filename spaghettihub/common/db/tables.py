@@ -1,11 +1,15 @@
-from sqlalchemy import (Column, DateTime, ForeignKey, Integer, LargeBinary,
-                        MetaData, String, Table, Text)
+from sqlalchemy import (Column, Computed, DateTime, ForeignKey, Index, Integer,
+                        LargeBinary, MetaData, String, Table, Text)
+from sqlalchemy.dialects.postgresql import TSVECTOR
 
 from spaghettihub.common.db.sequences import (BugCommentSequence,
+                                              EmbeddingChunkSequence,
                                               EmbeddingSequence,
+                                              LastUpdateSequence,
                                               LaunchpadToGithubWorkSequence,
+                                              MAASSequence,
                                               MergeProposalsSequence,
-                                              MyTextSequence, UsersSequence, MAASSequence)
+                                              MyTextSequence, UsersSequence)
 
 METADATA = MetaData()
 
@@ -14,6 +18,8 @@ MyTextTable = Table(
     METADATA,
     Column("id", Integer, MyTextSequence, primary_key=True),
     Column("content", Text, nullable=False),
+    # sha256 of the content, to tell whether a text changed without reading it.
+    Column("content_hash", String(64), nullable=False),
 )
 
 EmbeddingTable = Table(
@@ -22,6 +28,31 @@ EmbeddingTable = Table(
     Column("id", Integer, EmbeddingSequence, primary_key=True),
     Column("text_id", Integer, ForeignKey("text.id", ondelete="CASCADE")),
     Column("embedding", LargeBinary, nullable=False),
+    # The model that computed the embedding: the embeddings of each model are a separate vector set.
+    Column("model", String(256), nullable=False),
+    Index("ix_embedding_text_id_model", "text_id", "model", unique=True),
+    Index("ix_embedding_model_id", "model", "id"),
+)
+
+# The windows after the first one of the texts longer than the model input. The first window is in `embedding`.
+EmbeddingChunkTable = Table(
+    "embedding_chunk",
+    METADATA,
+    Column("id", Integer, EmbeddingChunkSequence, primary_key=True),
+    Column("text_id", Integer, ForeignKey("text.id", ondelete="CASCADE"), nullable=False),
+    Column("position", Integer, nullable=False),
+    Column("embedding", LargeBinary, nullable=False),
+    Column("model", String(256), nullable=False),
+    Index("ix_embedding_chunk_text_id_model", "text_id", "model"),
+)
+
+# Embeddings by model and normalized content, to never run the model twice on the same text.
+EmbeddingCacheTable = Table(
+    "embedding_cache",
+    METADATA,
+    Column("model", String(256), primary_key=True),
+    Column("content_hash", String(64), primary_key=True),
+    Column("embedding", LargeBinary, nullable=False),
 )
 
 BugTable = Table(
@@ -34,6 +65,8 @@ BugTable = Table(
     Column("title_id", Integer, ForeignKey("text.id", ondelete="CASCADE")),
     Column("description_id", Integer, ForeignKey(
         "text.id", ondelete="CASCADE")),
+    Index("ix_bug_title_id", "title_id"),
+    Index("ix_bug_description_id", "description_id"),
 )
 
 BugCommentTable = Table(
@@ -42,13 +75,18 @@ BugCommentTable = Table(
     Column("id", Integer, BugCommentSequence, primary_key=True),
     Column("bug_id", Integer, ForeignKey("bug.id")),
     Column("text_id", Integer, ForeignKey("text.id", ondelete="CASCADE")),
+    Index("ix_bug_comment_bug_id", "bug_id"),
+    Index("ix_bug_comment_text_id", "text_id"),
 )
 
 LastUpdateTable = Table(
     "last_update",
     METADATA,
-    Column("id", Integer, primary_key=True),
+    Column("id", Integer, LastUpdateSequence, primary_key=True),
+    # What the watermark is of, e.g. the bugs of a Launchpad project.
+    Column("source", String(256), nullable=False),
     Column("last_updated", DateTime(timezone=True)),
+    Index("ix_last_update_source", "source", unique=True),
 )
 
 MergeProposalTable = Table(
@@ -61,6 +99,19 @@ MergeProposalTable = Table(
     Column("target_git_path", Text, nullable=True),
     Column("registrant_name", Text, nullable=False),
     Column("web_link", Text, nullable=False),
+    Column("description", Text, nullable=True),
+    Column("commit_message_text_id", Integer, ForeignKey("text.id", ondelete="SET NULL"), nullable=True),
+    Column("description_text_id", Integer, ForeignKey("text.id", ondelete="SET NULL"), nullable=True),
+    Column(
+        "commit_message_tsv",
+        TSVECTOR,
+        Computed("to_tsvector('english', coalesce(commit_message, ''))", persisted=True),
+    ),
+    Index("ix_merge_proposal_date_merged_id", "date_merged", "id"),
+    Index("ix_merge_proposal_web_link", "web_link", unique=True),
+    Index("ix_merge_proposal_commit_message_text_id", "commit_message_text_id"),
+    Index("ix_merge_proposal_description_text_id", "description_text_id"),
+    Index("ix_merge_proposal_commit_message_tsv", "commit_message_tsv", postgresql_using="gin"),
 )
 
 LaunchpadToGithubWorkTable = Table(
@@ -86,6 +137,8 @@ MAASTable = Table(
     Column("commit_date", DateTime(timezone=True), nullable=True),
     Column("continuous_delivery_test_deb_status", String(64), nullable=True),
     Column("continuous_delivery_test_snap_status", String(64), nullable=True),
+    Index("ix_maas_commit_sha", "commit_sha"),
+    Index("ix_maas_commit_date_id", "commit_date", "id"),
 )
 
 UserTable = Table(
@@ -1,6 +1,7 @@
-from typing import List, Optional
+from typing import AsyncIterator, Dict, List, Optional
 
-from sqlalchemy import delete, insert, select
+from sqlalchemy import Select, and_, delete, insert, select
+from sqlalchemy.sql.functions import count
 from sqlalchemy.sql.operators import eq
 
 from spaghettihub.common.db.repository import BaseRepository
@@ -9,24 +10,37 @@ from spaghettihub.common.db.tables import EmbeddingTable, MyTextTable
 from spaghettihub.common.models.base import ListResult
 from spaghettihub.common.models.texts import MyText
 
+INSERT_BATCH_SIZE = 1000
+
 
 class TextsRepository(BaseRepository[MyText]):
-    async def get_next_id(self) -> int:
-        stmt = select(MyTextSequence.next_value())
-        return (
-            await self.connection_provider.get_current_connection().execute(stmt)
-        ).scalar()
+    sequence = MyTextSequence
+    id_block_size = 100
 
     async def create(self, entity: MyText) -> MyText:
         stmt = (
             insert(MyTextTable)
-            .returning(MyTextTable.c.id, MyTextTable.c.content)
-            .values(id=entity.id, content=entity.content)
+            .returning(MyTextTable.c.id, MyTextTable.c.content, MyTextTable.c.content_hash)
+            .values(id=entity.id, content=entity.content, content_hash=entity.content_hash)
         )
         result = await self.connection_provider.get_current_connection().execute(stmt)
         text = result.one()
         return MyText(**text._asdict())
 
+    async def create_many(self, entities: List[MyText]) -> None:
+        """
+        Insert all the texts with multi-row INSERTs of up to `INSERT_BATCH_SIZE` rows, below the limit of parameters
+        of a statement.
+        """
+        for i in range(0, len(entities), INSERT_BATCH_SIZE):
+            stmt = insert(MyTextTable).values(
+                [
+                    {"id": entity.id, "content": entity.content, "content_hash": entity.content_hash}
+                    for entity in entities[i:i + INSERT_BATCH_SIZE]
+                ]
+            )
+            await self.connection_provider.get_current_connection().execute(stmt)
+
     async def find_by_id(self, id: int) -> Optional[MyText]:
         stmt = select(
             "*").select_from(MyTextTable).where(MyTextTable.c.id == id)
@@ -47,16 +61,57 @@ class TextsRepository(BaseRepository[MyText]):
             delete(MyTextTable).where(MyTextTable.c.id == id)
         )
 
-    async def find_texts_without_embeddings(self) -> List[MyText]:
-        stmt = (
-            select(MyTextTable.c.id, MyTextTable.c.content)
+    async def delete_many(self, ids: List[int]) -> None:
+        if not ids:
+            return
+        await self.connection_provider.get_current_connection().execute(
+            delete(MyTextTable).where(MyTextTable.c.id.in_(ids))
+        )
+
+    async def find_content_hashes(self, ids: List[int]) -> Dict[int, str]:
+        if not ids:
+            return {}
+        stmt = select(MyTextTable.c.id, MyTextTable.c.content_hash).where(MyTextTable.c.id.in_(ids))
+        result = await self.connection_provider.get_current_connection().execute(stmt)
+        return {row.id: row.content_hash for row in result.all()}
+
+    def _without_embeddings(self, model: str, *columns) -> Select:
+        return (
+            select(*columns)
             .select_from(MyTextTable)
             .join(
                 EmbeddingTable,
-                eq(EmbeddingTable.c.text_id, MyTextTable.c.id),
+                and_(eq(EmbeddingTable.c.text_id, MyTextTable.c.id), eq(EmbeddingTable.c.model, model)),
                 isouter=True,
             )
             .where(eq(EmbeddingTable.c.text_id, None))
         )
+
+    async def find_texts_without_embeddings(self, model: str) -> List[MyText]:
+        """
+        The texts that have no embedding computed by `model`.
+        """
+        stmt = self._without_embeddings(model, MyTextTable.c.id, MyTextTable.c.content)
         result = await self.connection_provider.get_current_connection().execute(stmt)
         return [MyText(**row._asdict()) for row in result.all()]
+
+    async def count_texts_without_embeddings(self, model: str) -> int:
+        stmt = self._without_embeddings(model, count())
+        return (await self.connection_provider.get_current_connection().execute(stmt)).scalar()
+
+    async def stream_texts_without_embeddings(
+            self, model: str, batch_size: int, after_id: int = 0
+    ) -> AsyncIterator[List[MyText]]:
+        """
+        Like `find_texts_without_embeddings`, but the texts with an id greater than `after_id` are read in batches of
+        `batch_size` through a server side cursor, by increasing id, so that only a batch at a time is in memory. Must
+        run in a transaction.
+        """
+        stmt = (
+            self._without_embeddings(model, MyTextTable.c.id, MyTextTable.c.content)
+            .where(MyTextTable.c.id > after_id)
+            .order_by(MyTextTable.c.id)
+        )
+        result = await self.connection_provider.get_current_connection().stream(stmt)
+        async for rows in result.partitions(batch_size):
+            yield [MyText(**row._asdict()) for row in rows]
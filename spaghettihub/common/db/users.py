@@ -3,19 +3,15 @@ from typing import Optional
 from sqlalchemy import delete, insert, select
 
 from spaghettihub.common.db.repository import BaseRepository
-from spaghettihub.common.db.sequences import (UsersSequence)
-from spaghettihub.common.db.tables import (UserTable)
+from spaghettihub.common.db.sequences import UsersSequence
+from spaghettihub.common.db.tables import UserTable
 from spaghettihub.common.models.base import ListResult
 from spaghettihub.common.models.github import LaunchpadToGithubWork
 from spaghettihub.common.models.users import User
 
 
 class UsersRepository(BaseRepository[User]):
-    async def get_next_id(self) -> int:
-        stmt = select(UsersSequence.next_value())
-        return (
-            await self.connection_provider.get_current_connection().execute(stmt)
-        ).scalar()
+    sequence = UsersSequence
 
     async def create(self, entity: User) -> User:
         stmt = (
@@ -0,0 +1,56 @@
+import hashlib
+import re
+import unicodedata
+from collections import OrderedDict
+from typing import Generic, Hashable, Optional, TypeVar
+
+V = TypeVar("V")
+
+WHITESPACES = re.compile(r"\s+")
+
+
+def normalize_text(content: str) -> str:
+    """
+    The tokenizer splits on whitespaces, so texts that only differ in their whitespaces get the same embedding.
+    """
+    return WHITESPACES.sub(" ", unicodedata.normalize("NFC", content)).strip()
+
+
+def text_hash(content: str) -> str:
+    """
+    Key of `content` in the embedding caches, and `content_hash` of the stored texts: a text whose content only changes
+    in its whitespaces keeps its embedding.
+    """
+    return hashlib.sha256(normalize_text(content).encode()).hexdigest()
+
+
+class LRUCache(Generic[V]):
+    """
+    Mapping holding at most `maxsize` entries, dropping the least recently used ones.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.entries: OrderedDict[Hashable, V] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, key: Hashable) -> Optional[V]:
+        value = self.entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return value
+
+    def put(self, key: Hashable, value: V) -> None:
+        if self.maxsize <= 0:
+            return
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
@@ -0,0 +1,24 @@
+from typing import List
+
+
+def window_size(tokenizer, model) -> int:
+    """
+    Number of tokens of a text that fit in the model input, next to the special tokens.
+    """
+    max_length = min(tokenizer.model_max_length, model.config.max_position_embeddings)
+    return max_length - tokenizer.num_special_tokens_to_add()
+
+
+def split_windows(token_ids: List[int], size: int, overlap: int, max_windows: int) -> List[List[int]]:
+    """
+    Split `token_ids` in windows of `size` tokens, each one repeating the last `overlap` tokens of the previous one so
+    that no sentence is only seen cut in half. The first window is what the truncation would keep. Texts that need
+    more than `max_windows` windows are cut.
+    """
+    windows = [token_ids[:size]]
+    end = size
+    while end < len(token_ids) and len(windows) < max_windows:
+        start = end - overlap
+        windows.append(token_ids[start:start + size])
+        end = start + size
+    return windows
@@ -0,0 +1,422 @@
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+
+
+def normalize(matrix: np.ndarray) -> np.ndarray:
+    """
+    L2 normalize the rows of `matrix` so that a dot product is a cosine similarity.
+    """
+    matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1
+    return matrix / norms
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Positions of the `k` highest scores, best first. Only the selected scores are sorted.
+    """
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    top = np.argpartition(scores, -k)[-k:]
+    return top[np.argsort(scores[top])[::-1]]
+
+
+def top_k_texts(text_ids: np.ndarray, scores: np.ndarray, k: int) -> List[Tuple[int, float]]:
+    """
+    The `k` texts with the highest scores, best first, given the scores of rows that can share the same text (the
+    chunks of a long text): a text scores as its best row.
+    """
+    n = k
+    while True:
+        top = top_k(scores, n)
+        # `top` is sorted, so the first occurrence of a text is its best row.
+        _, first = np.unique(text_ids[top], return_index=True)
+        if len(first) >= k or n >= len(scores):
+            best = top[np.sort(first)[:k]]
+            return list(zip(text_ids[best].tolist(), scores[best].tolist()))
+        n *= 2
+
+
+FLOAT32 = "float32"
+FLOAT16 = "float16"
+INT8 = "int8"
+# The type of the stored rows for each quantization.
+QUANTIZATIONS = {FLOAT32: np.float32, FLOAT16: np.float16, INT8: np.int8}
+# Rows decoded to float32 at a time when scoring quantized rows: small enough for the buffer to stay in the CPU cache.
+DECODE_BLOCK_SIZE = 256
+# The bits of a float16 shifted into a float32, where the shift sign extends into the top bits: the mask keeps the sign
+# and the exponent and mantissa, which make the value times 2 ** -112 (the difference of the exponent biases).
+FLOAT16_SHIFT = 13
+FLOAT16_MASK = np.int32(-0x70002000)
+FLOAT16_SCALE = np.float32(2.0 ** 112)
+
+
+def quantize(matrix: np.ndarray, quantization: str) -> Tuple[np.ndarray, np.ndarray | None]:
+    """
+    Scalar quantization of normalized rows: float16, or int8 codes with a float32 scale per row such that
+    `codes * scale` is the row. Return the codes and the scales, which are None for the float types.
+    """
+    if quantization == FLOAT32:
+        return np.ascontiguousarray(matrix, dtype=np.float32), None
+    if quantization == FLOAT16:
+        return np.ascontiguousarray(matrix, dtype=np.float16), None
+    if quantization == INT8:
+        scales = (np.abs(matrix).max(axis=1) / 127 if len(matrix) else np.empty(0)).astype(np.float32)
+        scales[scales == 0] = 1
+        return np.rint(matrix / scales[:, None]).astype(np.int8), scales
+    raise ValueError(f"Unknown quantization {quantization}")
+
+
+def dequantize(codes: np.ndarray, scales: np.ndarray | None) -> np.ndarray:
+    matrix = np.asarray(codes, dtype=np.float32)
+    if scales is not None:
+        matrix = matrix * scales[:, None]
+    return matrix
+
+
+def decode_block(codes: np.ndarray, block: np.ndarray) -> None:
+    """
+    Decode the quantized rows `codes` into the float32 `block`. numpy casts float16 one element at a time, several
+    times slower than the product itself, so float16 rows are decoded through their bits instead, which is exact for
+    all the finite values.
+    """
+    if codes.dtype == np.float16:
+        bits = block.view(np.int32)
+        np.left_shift(codes.view(np.int16), FLOAT16_SHIFT, out=bits, dtype=np.int32)
+        np.bitwise_and(bits, FLOAT16_MASK, out=bits)
+        block *= FLOAT16_SCALE
+    else:
+        block[...] = codes
+
+
+def dot_scores(codes: np.ndarray, scales: np.ndarray | None, query: np.ndarray) -> np.ndarray:
+    """
+    Dot products of the quantized rows with a float32 query. The rows are decoded block by block into a small float32
+    buffer: numpy has no fast kernel for the float16 and int8 products, and decoding the whole matrix would need as
+    much memory as not quantizing it.
+    """
+    if codes.dtype == np.float32:
+        return codes @ query
+    scores = np.empty(len(codes), dtype=np.float32)
+    buffer = np.empty((min(DECODE_BLOCK_SIZE, len(codes)), codes.shape[1]), dtype=np.float32)
+    for i in range(0, len(codes), DECODE_BLOCK_SIZE):
+        block = buffer[:len(codes[i:i + DECODE_BLOCK_SIZE])]
+        decode_block(codes[i:i + DECODE_BLOCK_SIZE], block)
+        np.dot(block, query, out=scores[i:i + len(block)])
+    if scales is not None:
+        scores *= scales
+    return scores
+
+
+class ExactIndex:
+    """
+    Brute force cosine similarity search. All the embeddings are kept in a single contiguous matrix of normalized rows
+    with a parallel array of text ids, so that scoring the whole corpus is a single matrix-vector product. A text can
+    have more than one row, one per chunk, and it is scored as its best chunk.
+
+    The rows can be stored quantized, see `quantize`: float16 halves the memory and int8 divides it by four, at the
+    price of slightly approximate scores.
+    """
+
+    KIND = "exact"
+
+    def __init__(self, text_ids: np.ndarray, matrix: np.ndarray, normalized: bool = False,
+                 quantization: str = FLOAT32, scales: np.ndarray | None = None):
+        """
+        With `normalized`, `matrix` is trusted to hold normalized rows and it is used without a copy if it is already
+        quantized as requested, e.g. to search a memory mapped file. The int8 codes come with their `scales`.
+        """
+        self.text_ids = np.ascontiguousarray(text_ids, dtype=np.int64)
+        self.quantization = quantization
+        if not len(self.text_ids):
+            self.matrix, self.scales = quantize(np.empty((0, 0), dtype=np.float32), quantization)
+        elif normalized and matrix.dtype == QUANTIZATIONS[quantization]:
+            self.matrix, self.scales = matrix, scales
+        else:
+            self.matrix, self.scales = quantize(dequantize(matrix, scales) if normalized else normalize(matrix),
+                                                quantization)
+        self._reindex()
+
+    @classmethod
+    def from_embeddings(cls, embeddings: Iterable[Tuple[int, bytes]], **kwargs) -> "ExactIndex":
+        text_ids = []
+        buffers = []
+        for text_id, embedding in embeddings:
+            text_ids.append(text_id)
+            buffers.append(embedding)
+        if not buffers:
+            return cls(np.empty(0, dtype=np.int64), np.empty((0, 0), dtype=np.float32), **kwargs)
+        matrix = np.frombuffer(b"".join(buffers), dtype=np.float32).reshape(len(buffers), -1)
+        return cls(np.array(text_ids, dtype=np.int64), matrix, **kwargs)
+
+    def __len__(self) -> int:
+        return len(self.text_ids)
+
+    def _reindex(self) -> None:
+        # Sorted view of the text ids to look rows up with a binary search.
+        self._order = np.argsort(self.text_ids, kind="stable")
+        self._sorted_text_ids = self.text_ids[self._order]
+
+    def _rows(self, text_ids: Iterable[int]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        All the rows of the given texts, with the text id of each row.
+        """
+        text_ids = np.fromiter(text_ids, dtype=np.int64)
+        starts = np.searchsorted(self._sorted_text_ids, text_ids, side="left")
+        counts = np.searchsorted(self._sorted_text_ids, text_ids, side="right") - starts
+        # Expand the [start, start + count) ranges of the sorted ids.
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        return np.repeat(text_ids, counts), self._order[np.repeat(starts, counts) + offsets]
+
+    def vectors(self, text_ids: Iterable[int]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        The normalized embeddings of the texts that are in the index, with the text id of each of them. Quantized rows
+        are decoded, so they are only an approximation of the original embeddings.
+        """
+        text_ids, rows = self._rows(text_ids)
+        return text_ids, dequantize(self.matrix[rows], self._scales(rows))
+
+    def _scales(self, rows) -> np.ndarray | None:
+        return self.scales[rows] if self.scales is not None else None
+
+    def search(self, query: np.ndarray, k: int) -> List[Tuple[int, float]]:
+        """
+        Return the `k` most similar (text_id, score) pairs, best first.
+        """
+        if len(self) == 0 or k <= 0:
+            return []
+        return top_k_texts(self.text_ids, dot_scores(self.matrix, self.scales, normalize(query)), k)
+
+    def similarities(self, query: np.ndarray, text_ids: Iterable[int]) -> Dict[int, float]:
+        """
+        Exact scores for the given texts. Texts that are not in the index are omitted.
+        """
+        text_ids, rows = self._rows(text_ids)
+        scores = dot_scores(self.matrix[rows], self._scales(rows), normalize(query))
+        similarities = {}
+        for text_id, score in zip(text_ids.tolist(), scores.tolist()):
+            if score > similarities.get(text_id, -np.inf):
+                similarities[text_id] = score
+        return similarities
+
+    def add(self, text_ids: np.ndarray, matrix: np.ndarray) -> None:
+        text_ids = np.asarray(text_ids, dtype=np.int64)
+        if len(text_ids) == 0:
+            return
+        codes, scales = quantize(normalize(matrix), self.quantization)
+        if len(self) == 0:
+            self.matrix, self.scales = codes, scales
+        else:
+            self.matrix = np.concatenate([self.matrix, codes])
+            if scales is not None:
+                self.scales = np.concatenate([self.scales, scales])
+        self.text_ids = np.concatenate([self.text_ids, text_ids])
+        self._reindex()
+
+    def remove(self, text_ids: Iterable[int]) -> None:
+        _, rows = self._rows(text_ids)
+        if len(rows) == 0:
+            return
+        keep = np.ones(len(self), dtype=bool)
+        keep[rows] = False
+        self._keep(keep)
+
+    def _keep(self, keep: np.ndarray) -> None:
+        self.text_ids = self.text_ids[keep]
+        self.matrix = self.matrix[keep]
+        self.scales = self._scales(keep)
+        self._reindex()
+
+    def _arrays(self) -> Dict[str, np.ndarray]:
+        arrays = {"text_ids": self.text_ids, "matrix": self.matrix, "quantization": np.array(self.quantization)}
+        if self.scales is not None:
+            arrays["scales"] = self.scales
+        return arrays
+
+    def save(self, path: str) -> None:
+        with open(path, "wb") as f:
+            np.savez(f, kind=np.array(self.KIND), **self._arrays())
+
+    @classmethod
+    def _from_arrays(cls, arrays, **kwargs) -> "ExactIndex":
+        return cls(arrays["text_ids"], arrays["matrix"], normalized=True, **_quantization(arrays))
+
+
+class IVFIndex(ExactIndex):
+    """
+    Approximate search with an inverted file: the embeddings are clustered around `nlist` centroids and a query only
+    scores the rows of the `nprobe` closest clusters. Higher `nprobe` means better recall and slower searches. Small
+    indexes, or `nprobe >= nlist`, fall back to the exact search.
+    """
+
+    KIND = "ivf"
+    # Below this size the brute force scan is as fast as probing the clusters.
+    MIN_TRAINING_SIZE = 10000
+    TRAINING_POINTS_PER_LIST = 64
+    TRAINING_ITERATIONS = 10
+    # Retrain the centroids when the index grew this much since the last training.
+    RETRAIN_GROWTH = 2
+    # Scores of rows against the centroids computed at a time, when training and assigning: 64 MB of float32.
+    ASSIGNMENT_SCORES = 1 << 24
+
+    def __init__(self, text_ids: np.ndarray, matrix: np.ndarray, normalized: bool = False, nprobe: int = 16,
+                 nlist: int | None = None, quantization: str = FLOAT32, scales: np.ndarray | None = None):
+        super().__init__(text_ids, matrix, normalized=normalized, quantization=quantization, scales=scales)
+        self.nprobe = nprobe
+        self.nlist = nlist
+        self.centroids: np.ndarray | None = None
+        self.assignments = np.empty(0, dtype=np.int64)
+        self.trained_size = 0
+        self.train()
+
+    def is_trained(self) -> bool:
+        return self.centroids is not None
+
+    def train(self) -> None:
+        if len(self) < self.MIN_TRAINING_SIZE:
+            self.centroids = None
+            self.assignments = np.empty(0, dtype=np.int64)
+            return
+        nlist = self.nlist or int(4 * np.sqrt(len(self)))
+        rng = np.random.default_rng(0)
+        sample_rows = np.sort(
+            rng.choice(len(self), min(len(self), nlist * self.TRAINING_POINTS_PER_LIST), replace=False)
+        )
+        sample = dequantize(self.matrix[sample_rows], self._scales(sample_rows))
+        # Spherical k-means: the centroids are normalized like the rows, so the closest one has the highest dot product.
+        centroids = sample[rng.choice(len(sample), nlist, replace=False)]
+        for _ in range(self.TRAINING_ITERATIONS):
+            sums = np.zeros_like(centroids)
+            counts = np.zeros(nlist, dtype=np.int64)
+            for block in self._blocks(len(sample), nlist):
+                rows = sample[block]
+                assignments = np.argmax(rows @ centroids.T, axis=1)
+                # The rows sorted by list, so that each list is summed by a single reduceat over a contiguous run.
+                order = np.argsort(assignments, kind="stable")
+                lists, starts, sizes = np.unique(assignments[order], return_index=True, return_counts=True)
+                sums[lists] += np.add.reduceat(rows[order], starts, axis=0)
+                counts[lists] += sizes
+            empty = counts == 0
+            sums[empty] = centroids[empty]
+            centroids = normalize(sums)
+        self.centroids = centroids
+        self.assignments = self._assign(self.matrix, self.scales)
+        self.trained_size = len(self)
+        self._build_lists()
+
+    def _blocks(self, size: int, nlist: int) -> Iterable[slice]:
+        """
+        Blocks of rows small enough for their scores against `nlist` centroids to fit in `ASSIGNMENT_SCORES`.
+        """
+        step = max(1, self.ASSIGNMENT_SCORES // nlist)
+        return (slice(i, i + step) for i in range(0, size, step))
+
+    def _assign(self, matrix: np.ndarray, scales: np.ndarray | None) -> np.ndarray:
+        return np.concatenate([
+            np.argmax(
+                dequantize(matrix[block], scales[block] if scales is not None else None) @ self.centroids.T,
+                axis=1
+            )
+            for block in self._blocks(len(matrix), len(self.centroids))
+        ]) if len(matrix) else np.empty(0, dtype=np.int64)
+
+    def _build_lists(self) -> None:
+        self._list_rows = np.argsort(self.assignments, kind="stable")
+        self._list_offsets = np.concatenate([
+            [0], np.cumsum(np.bincount(self.assignments, minlength=len(self.centroids)))
+        ])
+
+    def search(self, query: np.ndarray, k: int) -> List[Tuple[int, float]]:
+        if not self.is_trained() or self.nprobe >= len(self.centroids):
+            return super().search(query, k)
+        if k <= 0:
+            return []
+        query = normalize(query)
+        lists = top_k(self.centroids @ query, self.nprobe)
+        rows = np.concatenate([self._list_rows[self._list_offsets[i]:self._list_offsets[i + 1]] for i in lists])
+        return top_k_texts(self.text_ids[rows], dot_scores(self.matrix[rows], self._scales(rows), query), k)
+
+    def add(self, text_ids: np.ndarray, matrix: np.ndarray) -> None:
+        super().add(text_ids, matrix)
+        if not self.is_trained() or len(self) >= self.RETRAIN_GROWTH * self.trained_size:
+            self.train()
+            return
+        new_rows = slice(len(self) - len(text_ids), len(self))
+        self.assignments = np.concatenate([
+            self.assignments, self._assign(self.matrix[new_rows], self._scales(new_rows))
+        ])
+        self._build_lists()
+
+    def _keep(self, keep: np.ndarray) -> None:
+        super()._keep(keep)
+        if self.is_trained():
+            self.assignments = self.assignments[keep]
+            self._build_lists()
+
+    def _arrays(self) -> Dict[str, np.ndarray]:
+        arrays = super()._arrays()
+        if self.is_trained():
+            arrays.update(
+                centroids=self.centroids,
+                assignments=self.assignments,
+                trained_size=np.array(self.trained_size)
+            )
+        return arrays
+
+    @classmethod
+    def _from_arrays(cls, arrays, nprobe: int = 16) -> "IVFIndex":
+        index = cls.__new__(cls)
+        ExactIndex.__init__(index, arrays["text_ids"], arrays["matrix"], normalized=True, **_quantization(arrays))
+        index.nprobe = nprobe
+        index.nlist = None
+        index.centroids = None
+        index.assignments = np.empty(0, dtype=np.int64)
+        index.trained_size = 0
+        if "centroids" in arrays:
+            index.centroids = arrays["centroids"]
+            index.nlist = len(index.centroids)
+            index.assignments = arrays["assignments"]
+            index.trained_size = int(arrays["trained_size"])
+            index._build_lists()
+        return index
+
+
+def concatenate(indexes: List[ExactIndex]) -> Tuple[np.ndarray, np.ndarray, np.ndarray | None]:
+    """
+    The text ids, rows and scales of all the `indexes`, which must share the same quantization. The arrays of a single
+    non empty index are returned as they are, so that a memory mapped matrix is not copied.
+    """
+    indexes = [index for index in indexes if len(index)]
+    if not indexes:
+        return np.empty(0, dtype=np.int64), np.empty((0, 0), dtype=np.float32), None
+    if len(indexes) == 1:
+        return indexes[0].text_ids, indexes[0].matrix, indexes[0].scales
+    return (
+        np.concatenate([index.text_ids for index in indexes]),
+        np.concatenate([index.matrix for index in indexes]),
+        np.concatenate([index.scales for index in indexes]) if indexes[0].scales is not None else None,
+    )
+
+
+def _quantization(arrays) -> dict:
+    # Indexes saved before the quantization was introduced hold float32 rows.
+    return {"quantization": str(arrays.get("quantization", FLOAT32)), "scales": arrays.get("scales")}
+
+
+INDEX_KINDS = {
+    ExactIndex.KIND: ExactIndex,
+    IVFIndex.KIND: IVFIndex,
+}
+
+
+def load_index(path: str, **kwargs) -> ExactIndex:
+    """
+    Load an index written by `save`. `kwargs` are the search settings of the index kind, e.g. `nprobe`.
+    """
+    with np.load(path) as arrays:
+        arrays = dict(arrays)
+    cls = INDEX_KINDS[str(arrays.pop("kind"))]
+    return cls._from_arrays(arrays, **kwargs)
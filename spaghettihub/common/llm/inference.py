@@ -0,0 +1,106 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Tuple
+
+import numpy as np
+
+
+class InferenceUnavailable(Exception):
+    """ The inference executor is overloaded or did not answer in time """
+
+
+def pool(model, inputs) -> np.ndarray:
+    """
+    Run the model on the tokenized `inputs` and average the last hidden states of each input.
+    """
+    # Imported here: the commands that never embed anything must not even pay for importing torch.
+    import torch
+
+    with torch.inference_mode():
+        outputs = model(**inputs)
+        # Mean over the real tokens only: a text must get the same embedding whatever the padding of its batch.
+        mask = inputs["attention_mask"].unsqueeze(-1).to(outputs.last_hidden_state.dtype)
+        embeddings = (outputs.last_hidden_state * mask).sum(dim=1) / mask.sum(dim=1)
+    return embeddings.cpu().numpy()
+
+
+def embed(tokenizer, model, contents: List[str]) -> np.ndarray:
+    inputs = tokenizer(
+        contents, return_tensors="pt", truncation=True, padding=True
+    )
+    return pool(model, inputs)
+
+
+def embed_windows(tokenizer, model, windows: List[List[int]]) -> np.ndarray:
+    """
+    Like `embed`, for windows of token ids that are already split to fit in the model input, see `split_windows`.
+    """
+    inputs = tokenizer.pad(
+        {"input_ids": [tokenizer.build_inputs_with_special_tokens(window) for window in windows]},
+        return_tensors="pt"
+    )
+    return pool(model, inputs)
+
+
+class InferenceExecutor:
+    """
+    Computes embeddings in a dedicated thread, so that a forward pass never blocks the event loop. The requests wait
+    in a queue of at most `max_queue_size` entries: the ones that arrive while the model is busy are coalesced in a
+    single batch of up to `max_batch_size` contents.
+
+    A request is rejected with `InferenceUnavailable` when the queue is full, or when it did not get its embedding
+    within `timeout` seconds.
+    """
+
+    def __init__(self, embed_batch: Callable[[List[str]], np.ndarray], max_batch_size: int = 16,
+                 max_queue_size: int = 64, timeout: float = 10.0):
+        self.embed_batch = embed_batch
+        self.max_batch_size = max_batch_size
+        self.max_queue_size = max_queue_size
+        self.timeout = timeout
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="inference")
+        # Created on first use, in the event loop of the server.
+        self.queue: asyncio.Queue[Tuple[str, asyncio.Future]] | None = None
+        self.task: asyncio.Task | None = None
+
+    async def embed(self, content: str) -> np.ndarray:
+        if self.task is None:
+            self.queue = asyncio.Queue(maxsize=self.max_queue_size)
+            self.task = asyncio.create_task(self._run())
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self.queue.put_nowait((content, future))
+        except asyncio.QueueFull:
+            raise InferenceUnavailable("Too many searches in progress, retry later")
+        try:
+            return await asyncio.wait_for(future, self.timeout)
+        except asyncio.TimeoutError:
+            raise InferenceUnavailable("The search timed out, retry later")
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            while len(batch) < self.max_batch_size and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            # Skip the requests that timed out while waiting.
+            batch = [(content, future) for content, future in batch if not future.done()]
+            if not batch:
+                continue
+            try:
+                matrix = await loop.run_in_executor(self.executor, self.embed_batch, [content for content, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for (_, future), embedding in zip(batch, matrix):
+                if not future.done():
+                    future.set_result(embedding)
+
+    async def close(self) -> None:
+        if self.task is not None:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,68 @@
+import threading
+from typing import Dict, Tuple
+
+MODEL_NAME = "BAAI/bge-large-en-v1.5"
+
+TORCH = "torch"
+# Linear layers with int8 weights, quantized when the model is loaded.
+TORCH_INT8 = "torch-int8"
+# The model exported to ONNX and run by ONNX Runtime, optionally with int8 weights. Requires onnxruntime.
+ONNX = "onnx"
+ONNX_INT8 = "onnx-int8"
+BACKENDS = (TORCH, TORCH_INT8, ONNX, ONNX_INT8)
+
+
+def model_name(model) -> str:
+    """
+    The name of the model run by `model`, whatever the backend: it identifies the vector set of the embeddings it
+    computes. The `name_or_path` of the int8 backends is the name suffixed with `@<backend>`, see `load_model`.
+    """
+    return model.name_or_path.split("@")[0]
+
+
+class ModelRegistry:
+    """
+    The tokenizers and models of the process, loaded on first use and then kept: loading BGE-large takes seconds and
+    more than a gigabyte, so nothing should load it before it is needed, nor more than once.
+
+    A model loaded by a parent process can be `share`d with the workers it spawns: its weights are moved to shared
+    memory and the workers map them read-only instead of loading their own copy.
+    """
+
+    def __init__(self):
+        self.models: Dict[Tuple[str, str], Tuple] = {}
+        # The models are loaded from worker threads too, e.g. by the inference executor.
+        self.lock = threading.Lock()
+
+    def get(self, name: str = MODEL_NAME, backend: str = TORCH) -> Tuple:
+        """
+        The (tokenizer, model) of `name` running on `backend`.
+        """
+        with self.lock:
+            if (name, backend) not in self.models:
+                # Imported here: the commands that never embed anything must not even pay for importing torch.
+                from spaghettihub.common.llm.backends import load_model
+                self.models[(name, backend)] = load_model(name, backend)
+            return self.models[(name, backend)]
+
+    def share(self, name: str = MODEL_NAME, backend: str = TORCH) -> Tuple | None:
+        """
+        The (tokenizer, model) to hand to spawned workers, with the weights in shared memory, or None if the backend
+        cannot be shared and every worker has to load its own.
+        """
+        if backend != TORCH:
+            # The packed int8 weights and the ONNX Runtime sessions cannot be pickled.
+            return None
+        tokenizer, model = self.get(name, backend)
+        model.share_memory()
+        return tokenizer, model
+
+    def put(self, tokenizer, model, name: str = MODEL_NAME, backend: str = TORCH) -> None:
+        """
+        Register a model received from the parent process.
+        """
+        with self.lock:
+            self.models[(name, backend)] = (tokenizer, model)
+
+
+MODELS = ModelRegistry()
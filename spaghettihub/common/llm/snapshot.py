@@ -0,0 +1,140 @@
+import json
+import os
+import shutil
+from typing import Optional
+
+import numpy as np
+
+from spaghettihub.common.llm.index import (FLOAT32, QUANTIZATIONS, normalize,
+                                           quantize)
+from spaghettihub.common.llm.registry import MODEL_NAME
+
+
+def snapshot_path(path: str, model: str) -> str:
+    """
+    Where the snapshot of `model` is written under `path`: every model has its own, so that the rollout of a new model
+    does not replace the snapshot of the one the server is searching.
+    """
+    return f"{path}.{model.replace('/', '--')}"
+
+
+class EmbeddingsSnapshot:
+    """
+    On-disk copy of the embeddings of a model: a matrix of normalized rows, optionally quantized, and the parallel text
+    ids, both memory mapped, plus the highest embedding id they contain. The embeddings of the texts that are not in it
+    have to be read from the database: not only the ones with a higher id, which can be committed in any order.
+
+    With `chunks`, the rows of the texts include the ones of their chunks, so a text can have more than one row.
+    """
+
+    MATRIX = "matrix.npy"
+    SCALES = "scales.npy"
+    TEXT_IDS = "text_ids.npy"
+    METADATA = "metadata.json"
+
+    def __init__(self, text_ids: np.ndarray, matrix: np.ndarray, version: int, quantization: str = FLOAT32,
+                 scales: np.ndarray | None = None, model: str = MODEL_NAME, chunks: bool = False):
+        self.text_ids = text_ids
+        self.matrix = matrix
+        self.version = version
+        self.quantization = quantization
+        self.scales = scales
+        self.model = model
+        self.chunks = chunks
+
+    @classmethod
+    def load(cls, path: str) -> Optional["EmbeddingsSnapshot"]:
+        if not os.path.exists(os.path.join(path, cls.METADATA)):
+            return None
+        with open(os.path.join(path, cls.METADATA)) as f:
+            metadata = json.load(f)
+        # Rows deleted while the snapshot was written, and the chunks of the texts whose embedding is not in it, leave
+        # some unused space at the end of the files.
+        size = metadata["size"]
+        scales = None
+        if os.path.exists(os.path.join(path, cls.SCALES)):
+            scales = np.load(os.path.join(path, cls.SCALES), mmap_mode="r")[:size]
+        return cls(
+            text_ids=np.load(os.path.join(path, cls.TEXT_IDS), mmap_mode="r")[:size],
+            matrix=np.load(os.path.join(path, cls.MATRIX), mmap_mode="r")[:size],
+            version=metadata["version"],
+            # Snapshots written before the quantization was introduced hold float32 rows.
+            quantization=metadata.get("quantization", FLOAT32),
+            scales=scales,
+            # Snapshots written before the models were configurable hold the default one.
+            model=metadata.get("model", MODEL_NAME),
+            # Snapshots written before they held the chunks.
+            chunks=metadata.get("chunks", False),
+        )
+
+
+class EmbeddingsSnapshotWriter:
+    """
+    Write a snapshot of at most `size` rows batch by batch, so that the whole table is never in memory. The snapshot
+    replaces the one at `path` only on `commit`. The rows are stored with the given `quantization`, and they must
+    include the ones of the chunks of the texts.
+    """
+
+    def __init__(self, path: str, size: int, version: int, quantization: str = FLOAT32, model: str = MODEL_NAME):
+        self.path = path
+        self.tmp_path = path + ".tmp"
+        self.size = size
+        self.version = version
+        self.quantization = quantization
+        self.model = model
+        self.written = 0
+        self.text_ids = None
+        self.matrix = None
+        self.scales = None
+        shutil.rmtree(self.tmp_path, ignore_errors=True)
+        os.makedirs(self.tmp_path)
+
+    def append(self, text_ids: np.ndarray, matrix: np.ndarray) -> None:
+        if self.matrix is None:
+            self.text_ids = np.lib.format.open_memmap(
+                os.path.join(self.tmp_path, EmbeddingsSnapshot.TEXT_IDS), mode="w+", dtype=np.int64,
+                shape=(self.size,)
+            )
+            self.matrix = np.lib.format.open_memmap(
+                os.path.join(self.tmp_path, EmbeddingsSnapshot.MATRIX), mode="w+",
+                dtype=QUANTIZATIONS[self.quantization], shape=(self.size, matrix.shape[1])
+            )
+        end = self.written + len(text_ids)
+        codes, scales = quantize(normalize(matrix), self.quantization)
+        if scales is not None:
+            if self.scales is None:
+                self.scales = np.lib.format.open_memmap(
+                    os.path.join(self.tmp_path, EmbeddingsSnapshot.SCALES), mode="w+", dtype=np.float32,
+                    shape=(self.size,)
+                )
+            self.scales[self.written:end] = scales
+        self.text_ids[self.written:end] = text_ids
+        self.matrix[self.written:end] = codes
+        self.written = end
+
+    def commit(self) -> None:
+        if self.matrix is None:
+            np.save(os.path.join(self.tmp_path, EmbeddingsSnapshot.TEXT_IDS), np.empty(0, dtype=np.int64))
+            np.save(
+                os.path.join(self.tmp_path, EmbeddingsSnapshot.MATRIX),
+                np.empty((0, 0), dtype=QUANTIZATIONS[self.quantization])
+            )
+        else:
+            self.text_ids.flush()
+            self.matrix.flush()
+            if self.scales is not None:
+                self.scales.flush()
+        with open(os.path.join(self.tmp_path, EmbeddingsSnapshot.METADATA), "w") as f:
+            json.dump(
+                {
+                    "version": self.version, "size": self.written, "quantization": self.quantization,
+                    "model": self.model, "chunks": True
+                },
+                f
+            )
+        old_path = self.path + ".old"
+        shutil.rmtree(old_path, ignore_errors=True)
+        if os.path.exists(self.path):
+            os.rename(self.path, old_path)
+        os.rename(self.tmp_path, self.path)
+        shutil.rmtree(old_path, ignore_errors=True)
@@ -1,5 +1,5 @@
 from dataclasses import dataclass
-from typing import Generic, List, Sequence, TypeVar, Union
+from typing import Generic, List, Optional, Sequence, TypeVar, Union
 
 from pydantic import BaseModel, PrivateAttr
 from pydantic.generics import GenericModel
@@ -11,11 +11,13 @@ T = TypeVar("T")
 class ListResult(Generic[T]):
     """
     Encapsulates the result of calling a Repository method than returns a list. It includes the items and the number of items
-    that matched the query.
+    that matched the query. The total might be an estimate, or None when it was not computed. `next_cursor` is the
+    cursor of the next page for the keyset paginated methods.
     """
 
     items: Sequence[T]
-    total: int
+    total: Optional[int]
+    next_cursor: Optional[str] = None
 
 
 class Unset(BaseModel):
@@ -33,3 +33,16 @@ class BugWithCommentsAndScores(BaseModel):
     title_score: float
     description_score: float
     comments: List[BugCommentWithScore]
+
+
+class LaunchpadBug(BaseModel):
+    """
+    A bug as fetched from the Launchpad API. The first message is the bug description.
+    """
+    id: int
+    title: str
+    description: str
+    date_created: datetime
+    date_last_updated: datetime
+    web_link: str
+    messages: List[str]
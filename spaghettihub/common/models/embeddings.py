@@ -7,4 +7,19 @@ from spaghettihub.common.models.texts import MyText
 class Embedding(BaseModel):
     id: int
     embedding: bytes
+    model: str
     text: OneToOne[MyText]
+
+
+class EmbeddingChunk(BaseModel):
+    id: int
+    position: int
+    embedding: bytes
+    model: str
+    text: OneToOne[MyText]
+
+
+class CachedEmbedding(BaseModel):
+    model: str
+    content_hash: str
+    embedding: bytes
@@ -5,4 +5,5 @@ from pydantic import BaseModel
 
 class LastUpdate(BaseModel):
     id: int
+    source: str
     last_updated: datetime
@@ -1,7 +1,11 @@
 from datetime import datetime
+from enum import Enum
 
 from pydantic import BaseModel
 
+from spaghettihub.common.models.base import OneToOne
+from spaghettihub.common.models.texts import MyText
+
 
 class MergeProposal(BaseModel):
     id: int
@@ -11,3 +15,37 @@ class MergeProposal(BaseModel):
     target_git_path: str | None  # blz not working otherwise
     registrant_name: str
     web_link: str
+    description: str | None = None
+    # The commit message and the description as embedded texts. Only loaded by the crawler.
+    commit_message_text: OneToOne[MyText] | None = None
+    description_text: OneToOne[MyText] | None = None
+
+
+class MergeProposalWithScore(BaseModel):
+    merge_proposal: MergeProposal
+    score: float
+
+
+class LaunchpadMergeProposal(BaseModel):
+    """
+    A merged MP as fetched from the Launchpad API.
+    """
+    commit_message: str | None
+    date_merged: datetime
+    source_git_path: str | None
+    target_git_path: str | None
+    registrant_name: str
+    web_link: str
+    description: str | None = None
+
+
+class MergeProposalSearchMode(str, Enum):
+    # Words and phrases, matched on the full text index.
+    FULLTEXT = "fulltext"
+    # Literal substring of the commit message. Needs a scan of the whole table.
+    SUBSTRING = "substring"
+
+
+class MergeProposalSearchOrder(str, Enum):
+    RELEVANCE = "relevance"
+    DATE = "date"
@@ -4,3 +4,4 @@ from pydantic import BaseModel
 class MyText(BaseModel):
     id: int
     content: str
+    content_hash: str | None = None
@@ -1,9 +1,12 @@
-from typing import List, Optional
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
 
 from spaghettihub.common.db.base import ConnectionProvider
 from spaghettihub.common.db.bugs import BugsRepository
+from spaghettihub.common.llm.cache import text_hash
 from spaghettihub.common.models.base import OneToOne
-from spaghettihub.common.models.bugs import Bug, BugComment
+from spaghettihub.common.models.bugs import Bug, BugComment, LaunchpadBug
 from spaghettihub.common.models.texts import MyText
 from spaghettihub.common.services.base import Service
 from spaghettihub.common.services.texts import TextsService
@@ -21,42 +24,102 @@ class BugsService(Service):
         self.bugs_repository = bugs_repository
         self.texts_service = texts_service
 
-    async def process_launchpad_bug(self, b) -> Optional[Bug]:
-        bug = await self.bugs_repository.find_by_id(b.bug.id)
-        if not bug or bug.date_last_updated < b.bug.date_last_updated:
-            title_text = await self.texts_service.create(b.bug.title)
-            description_text = await self.texts_service.create(b.bug.description)
-            if not bug:
-                # bug is new
-                await self.bugs_repository.create(
-                    Bug(
-                        id=b.bug.id,
-                        date_created=b.bug.date_created,
-                        date_last_updated=b.bug.date_last_updated,
-                        web_link=b.bug.web_link,
-                        title=OneToOne[MyText](id=title_text.id),
-                        description=OneToOne[MyText](id=description_text.id),
-                    )
-                )
-            else:
-                # update the bug
-                old_text_id = bug.title.id
-                old_description_id = bug.description.id
-                bug.title.set_id(title_text.id)
-                bug.description.set_id(description_text.id)
-                bug.date_last_updated = b.bug.date_last_updated
-                await self.bugs_repository.update(bug)
-                await self.texts_service.delete(old_text_id)
-                await self.texts_service.delete(old_description_id)
-
-            await self.delete_comments(b.bug.id)
-            # skip the first, always equal to the description
-            first = True
-            for m in b.bug.messages:
-                if first:
-                    first = False
-                    continue
-                await self.add_comment(b.bug.id, m.content)
+    async def process_launchpad_bug(self, lp_bug: LaunchpadBug) -> Optional[Bug]:
+        written = await self.process_launchpad_bugs([lp_bug])
+        return written[0] if written else await self.bugs_repository.find_by_id(lp_bug.id)
+
+    async def process_launchpad_bugs(self, lp_bugs: List[LaunchpadBug]) -> List[Bug]:
+        """
+        Create or update the bugs, and return the ones that were written: the bugs that did not change since they were
+        stored are skipped.
+
+        The whole batch takes a fixed number of statements whatever its size: the ids of the new texts and comments are
+        allocated in a single round-trip, and the texts, bugs and comments are written with multi-row INSERTs.
+
+        The texts that did not change are kept, together with their embeddings: usually the update of a bug is a new
+        comment and that is the only text to embed.
+        """
+        # The last version of a bug wins, an INSERT ... ON CONFLICT cannot update the same row twice.
+        lp_bugs = list({lp_bug.id: lp_bug for lp_bug in lp_bugs}.values())
+        bugs = await self.bugs_repository.find_many([lp_bug.id for lp_bug in lp_bugs])
+        lp_bugs = [
+            lp_bug for lp_bug in lp_bugs
+            if lp_bug.id not in bugs or bugs[lp_bug.id].date_last_updated < lp_bug.date_last_updated
+        ]
+        if not lp_bugs:
+            return []
+        comment_text_ids = await self.bugs_repository.find_comments_text_ids([lp_bug.id for lp_bug in lp_bugs])
+        hashes = await self.texts_service.find_content_hashes(
+            [text_id for bug in bugs.values() for text_id in (bug.title.id, bug.description.id)]
+            + [text_id for text_ids in comment_text_ids.values() for text_id in text_ids]
+        )
+
+        new_texts: List[MyText] = []
+        new_comments: List[Tuple[int, MyText]] = []
+        stale_text_ids = []
+
+        def new_text(content: str) -> MyText:
+            # The id is set once the ids of all the new texts are allocated.
+            text = MyText(id=0, content=content, content_hash=text_hash(content))
+            new_texts.append(text)
+            return text
+
+        title_texts = {}
+        description_texts = {}
+        for lp_bug in lp_bugs:
+            bug = bugs.get(lp_bug.id)
+            for texts, text_id, content in (
+                    (title_texts, bug.title.id if bug else None, lp_bug.title),
+                    (description_texts, bug.description.id if bug else None, lp_bug.description),
+            ):
+                if text_id is None or hashes.get(text_id) != text_hash(content):
+                    texts[lp_bug.id] = new_text(content)
+                    if text_id is not None:
+                        stale_text_ids.append(text_id)
+
+            existing_comments = defaultdict(list)
+            for text_id in comment_text_ids.get(lp_bug.id, []):
+                existing_comments[hashes.get(text_id)].append(text_id)
+            # skip the first message, always equal to the description
+            for content in lp_bug.messages[1:]:
+                if existing_comments[text_hash(content)]:
+                    existing_comments[text_hash(content)].pop(0)
+                else:
+                    new_comments.append((lp_bug.id, new_text(content)))
+            # Comments that are gone: their rows and embeddings are cascaded.
+            stale_text_ids += [text_id for text_ids in existing_comments.values() for text_id in text_ids]
+
+        if new_texts:
+            for text, text_id in zip(new_texts, await self.texts_service.get_next_ids(len(new_texts))):
+                text.id = text_id
+            await self.texts_service.create_many(new_texts)
+
+        written = []
+        for lp_bug in lp_bugs:
+            bug = bugs.get(lp_bug.id)
+            written.append(Bug(
+                id=lp_bug.id,
+                date_created=bug.date_created if bug else lp_bug.date_created,
+                date_last_updated=lp_bug.date_last_updated,
+                web_link=lp_bug.web_link,
+                title=OneToOne[MyText](
+                    id=title_texts[lp_bug.id].id if lp_bug.id in title_texts else bug.title.id
+                ),
+                description=OneToOne[MyText](
+                    id=description_texts[lp_bug.id].id if lp_bug.id in description_texts else bug.description.id
+                ),
+            ))
+        await self.bugs_repository.upsert_many(written)
+
+        if new_comments:
+            comment_ids = await self.bugs_repository.get_next_comment_ids(len(new_comments))
+            await self.bugs_repository.add_comments([
+                BugComment(id=comment_id, bug=OneToOne[Bug](id=bug_id), text=OneToOne[MyText](id=text.id))
+                for comment_id, (bug_id, text) in zip(comment_ids, new_comments)
+            ])
+        # Only once the bugs refer to their new texts: deleting a title or description cascades to its bug.
+        await self.texts_service.delete_many(stale_text_ids)
+        return written
 
     async def delete_comments(self, bug_id: int) -> None:
         # embeddings and texts are cascaded
@@ -77,3 +140,15 @@ class BugsService(Service):
 
     async def get_bug_comments(self, bug_id: int) -> List[BugComment]:
         return await self.bugs_repository.find_bug_comments(bug_id)
+
+    async def find_bug_ids_by_text_ids(self, text_ids: List[int] | None = None) -> Dict[int, int]:
+        return await self.bugs_repository.find_bug_ids_by_text_ids(text_ids)
+
+    async def find_last_updated_dates(self) -> Dict[int, datetime]:
+        return await self.bugs_repository.find_last_updated_dates()
+
+    async def find_bugs_by_ids(self, ids: List[int]) -> List[Bug]:
+        return await self.bugs_repository.find_by_ids(ids)
+
+    async def get_bugs_comments(self, bug_ids: List[int]) -> Dict[int, List[BugComment]]:
+        return await self.bugs_repository.find_bugs_comments(bug_ids)
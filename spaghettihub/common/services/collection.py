@@ -2,6 +2,7 @@ from temporalio.client import Client
 
 from spaghettihub.common.db.base import ConnectionProvider
 from spaghettihub.common.db.bugs import BugsRepository
+from spaghettihub.common.db.embedding_cache import EmbeddingCacheRepository
 from spaghettihub.common.db.embeddings import EmbeddingsRepository
 from spaghettihub.common.db.github import LaunchpadToGithubWorkRepository
 from spaghettihub.common.db.last_update import LastUpdateRepository
@@ -51,21 +52,26 @@ class ServiceCollection:
                 connection_provider=connection_provider),
             texts_service=services.texts_service,
         )
+        services.merge_proposals_service = MergeProposalsService(
+            connection_provider=connection_provider,
+            merge_proposals_repository=MergeProposalsRepository(
+                connection_provider=connection_provider
+            ),
+            texts_service=services.texts_service,
+        )
         services.embeddings_service = EmbeddingsService(
             connection_provider=connection_provider,
             embeddings_repository=EmbeddingsRepository(
                 connection_provider=connection_provider
             ),
+            embedding_cache_repository=EmbeddingCacheRepository(
+                connection_provider=connection_provider
+            ),
             texts_service=services.texts_service,
             bugs_service=services.bugs_service,
+            merge_proposals_service=services.merge_proposals_service,
             embeddings_cache=embeddings_cache
         )
-        services.merge_proposals_service = MergeProposalsService(
-            connection_provider=connection_provider,
-            merge_proposals_repository=MergeProposalsRepository(
-                connection_provider=connection_provider
-            )
-        )
         services.launchpad_to_github_work_service = LaunchpadToGithubWorkService(
             connection_provider=connection_provider,
             launchpad_to_github_work_repository=LaunchpadToGithubWorkRepository(
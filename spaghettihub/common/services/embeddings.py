@@ -1,31 +1,138 @@
-from typing import List
+import asyncio
+import copy
+import logging
+import os
+from typing import Awaitable, Callable, Dict, List, Tuple
 
 import numpy as np
-from numpy.linalg import norm
 
 from spaghettihub.common.db.base import ConnectionProvider
+from spaghettihub.common.db.embedding_cache import EmbeddingCacheRepository
 from spaghettihub.common.db.embeddings import EmbeddingsRepository
+from spaghettihub.common.llm.cache import LRUCache, text_hash
+from spaghettihub.common.llm.chunking import split_windows, window_size
+from spaghettihub.common.llm.index import (FLOAT32, ExactIndex, IVFIndex,
+                                           concatenate, load_index)
+from spaghettihub.common.llm.inference import (InferenceExecutor, embed,
+                                               embed_windows)
+from spaghettihub.common.llm.registry import (MODEL_NAME, MODELS, TORCH,
+                                              model_name)
+from spaghettihub.common.llm.snapshot import (EmbeddingsSnapshot,
+                                              EmbeddingsSnapshotWriter,
+                                              snapshot_path)
 from spaghettihub.common.models.base import OneToOne
 from spaghettihub.common.models.bugs import (BugCommentWithScore,
                                              BugWithCommentsAndScores)
-from spaghettihub.common.models.embeddings import Embedding
+from spaghettihub.common.models.embeddings import (CachedEmbedding, Embedding,
+                                                   EmbeddingChunk)
+from spaghettihub.common.models.merge_proposals import MergeProposalWithScore
 from spaghettihub.common.models.texts import MyText
 from spaghettihub.common.services.base import Service
 from spaghettihub.common.services.bugs import BugsService
+from spaghettihub.common.services.merge_proposals import MergeProposalsService
 from spaghettihub.common.services.texts import TextsService
 
+log = logging.getLogger()
+
 
 class EmbeddingsCache:
-    def __init__(self, tokenizer, model):
-        self.cache: dict[int, np.ndarray] | None = None
-        self.tokenizer = tokenizer
-        self.model = model
+    def __init__(self, model_name: str = MODEL_NAME, backend: str = TORCH, index_kind: str = ExactIndex.KIND,
+                 index_path: str | None = None, nprobe: int = 16, snapshot_path: str | None = None,
+                 query_cache_size: int = 1024, quantization: str = FLOAT32, rerank: int = 200, inference_batch_size: int = 16,
+                 inference_queue_size: int = 64, inference_timeout: float = 10.0):
+        self.index: ExactIndex | None = None
+        # The bug of every text in the index, to avoid a query per search result.
+        self.text_id_to_bug_id: dict[int, int] = {}
+        # The MP of every commit message and description in the index: they share it with the bug texts.
+        self.text_id_to_merge_proposal_id: dict[int, int] = {}
+        # Serializes the loads and refreshes of the index. Searches do not need it: a refresh swaps in a new index.
+        self.lock = asyncio.Lock()
+        # The model embedding the search queries, and whose vector set is searched. It is only loaded by the first
+        # search, see `load_model`.
+        self.model_name = model_name
+        self.backend = backend
+        self.tokenizer = None
+        self.model = None
+        self.model_lock = asyncio.Lock()
+        self.index_kind = index_kind
+        self.index_path = index_path
+        self.nprobe = nprobe
+        self.snapshot_path = snapshot_path
+        self.quantization = quantization
+        # How many of the best results of a search on quantized embeddings are scored again in full precision.
+        self.rerank = rerank
+        # Embeddings of the recent search queries, by model and text hash.
+        self.query_embeddings: LRUCache[np.ndarray] = LRUCache(query_cache_size)
+        # The search queries are embedded off the event loop.
+        self.inference = InferenceExecutor(
+            lambda contents: embed(self.tokenizer, self.model, contents),
+            max_batch_size=inference_batch_size,
+            max_queue_size=inference_queue_size,
+            timeout=inference_timeout
+        )
+
+    def get_index(self) -> ExactIndex | None:
+        return self.index
+
+    def set_index(self, index: ExactIndex) -> None:
+        self.index = index
+
+    def get_text_id_to_bug_id(self) -> dict[int, int]:
+        return self.text_id_to_bug_id
+
+    def set_text_id_to_bug_id(self, text_id_to_bug_id: dict[int, int]) -> None:
+        self.text_id_to_bug_id = text_id_to_bug_id
 
-    def get_cache(self) -> dict[int, np.ndarray] | None:
-        return self.cache
+    def get_text_id_to_merge_proposal_id(self) -> dict[int, int]:
+        return self.text_id_to_merge_proposal_id
 
-    def set_cache(self, cache: dict[int, np.ndarray]) -> None:
-        self.cache = cache
+    def set_text_id_to_merge_proposal_id(self, text_id_to_merge_proposal_id: dict[int, int]) -> None:
+        self.text_id_to_merge_proposal_id = text_id_to_merge_proposal_id
+
+    def _new_index(self, text_ids: np.ndarray, matrix: np.ndarray, normalized: bool,
+                   scales: np.ndarray | None) -> ExactIndex:
+        if self.index_kind == IVFIndex.KIND:
+            return IVFIndex(text_ids, matrix, normalized=normalized, nprobe=self.nprobe, quantization=self.quantization,
+                            scales=scales)
+        return ExactIndex(text_ids, matrix, normalized=normalized, quantization=self.quantization, scales=scales)
+
+    def build_index(self, text_ids: np.ndarray, matrix: np.ndarray, normalized: bool = False,
+                    scales: np.ndarray | None = None) -> ExactIndex:
+        """
+        Build the configured index for the embeddings. If an index of the model was persisted under `index_path`, it is
+        reused and only synced with the embeddings, so the approximate indexes are not retrained at every start.
+        """
+        # Every model has its own index, like its own snapshot: the vectors of two models are not comparable, even
+        # when they have the same size.
+        path = snapshot_path(self.index_path, self.model_name) if self.index_path else None
+        if path and os.path.exists(path):
+            index = load_index(path, nprobe=self.nprobe)
+            if index.KIND == self.index_kind and index.quantization == self.quantization:
+                exact = ExactIndex(text_ids, matrix, normalized=normalized, quantization=self.quantization,
+                                   scales=scales)
+                index.remove(np.setdiff1d(index.text_ids, exact.text_ids))
+                index.add(*exact.vectors(np.setdiff1d(exact.text_ids, index.text_ids)))
+                index.save(path)
+                return index
+        index = self._new_index(text_ids, matrix, normalized, scales)
+        if path:
+            index.save(path)
+        return index
+
+    def get_query_embeddings(self) -> LRUCache[np.ndarray]:
+        return self.query_embeddings
+
+    def get_inference(self) -> InferenceExecutor:
+        return self.inference
+
+    async def load_model(self) -> None:
+        """
+        Load the model in a thread, if it was not loaded yet, so that the server keeps serving meanwhile.
+        """
+        if self.model is None:
+            async with self.model_lock:
+                if self.model is None:
+                    self.tokenizer, self.model = await asyncio.to_thread(MODELS.get, self.model_name, self.backend)
 
     def get_tokenizer(self):
         return self.tokenizer
@@ -35,83 +142,463 @@ class EmbeddingsCache:
 
 
 class EmbeddingsService(Service):
+    # How many texts to score for each bug we have to return. A bug has many texts (title, description and comments),
+    # so the best matches are likely to belong to the same bugs.
+    CANDIDATES_PER_BUG = 10
+    # Tokens shared by two consecutive chunks of a long text.
+    CHUNK_OVERLAP = 64
+    # Crash reports can be huge: only their beginning is embedded.
+    MAX_CHUNKS = 32
+    # Texts whose embeddings are read with a single query when (re)loading the index.
+    LOAD_BATCH_SIZE = 10000
 
     def __init__(
             self,
             connection_provider: ConnectionProvider,
             embeddings_repository: EmbeddingsRepository,
+            embedding_cache_repository: EmbeddingCacheRepository,
             texts_service: TextsService,
             bugs_service: BugsService,
+            merge_proposals_service: MergeProposalsService,
             embeddings_cache: EmbeddingsCache | None = None
     ):
         super().__init__(connection_provider)
         self.embeddings_repository = embeddings_repository
+        self.embedding_cache_repository = embedding_cache_repository
         self.texts_service = texts_service
         self.bugs_service = bugs_service
+        self.merge_proposals_service = merge_proposals_service
         self.embeddings_cache = embeddings_cache
 
-    def cosine_similarity(self, a, b):
-        return np.dot(a, b) / (norm(a) * norm(b))
-
     async def generate_and_store_embedding(
             self, tokenizer, model, text: MyText
     ) -> Embedding:
-        embedding = await self.generate(tokenizer, model, text.content)
-        return await self.embeddings_repository.create(
+        return (await self.generate_and_store_embeddings(tokenizer, model, [text]))[0]
+
+    async def generate_and_store_embeddings(
+            self, tokenizer, model, texts: List[MyText], chunking: bool = False
+    ) -> List[Embedding]:
+        """
+        Embed `texts` in a single forward pass and store them with a single INSERT. The texts already embedded by the
+        model, e.g. the same boilerplate comment in another bug, are taken from the embedding cache instead.
+
+        The embedding covers the beginning of the texts that are longer than the model input. With `chunking`, the
+        rest of them is embedded too, in overlapping chunks, and the search scores a text as its best chunk.
+        """
+        if not texts:
+            return []
+        if chunking:
+            await self.generate_and_store_chunks(tokenizer, model, texts)
+        matrix = await self.generate_cached_batch(tokenizer, model, [text.content for text in texts])
+        ids = await self.embeddings_repository.get_next_ids(len(texts))
+        embeddings = [
             Embedding(
-                id=await self.embeddings_repository.get_next_id(),
+                id=id,
                 text=OneToOne[MyText](id=text.id),
                 embedding=embedding.tobytes(),
+                model=model_name(model),
             )
+            for id, text, embedding in zip(ids, texts, matrix)
+        ]
+        await self.embeddings_repository.create_many(embeddings)
+        if self._serves(model):
+            self.embeddings_cache.get_index().add(np.array([text.id for text in texts]), matrix)
+        return embeddings
+
+    def _serves(self, model) -> bool:
+        """
+        Whether the embeddings computed by `model` belong to the loaded search index.
+        """
+        return (
+            self.embeddings_cache is not None
+            and self.embeddings_cache.get_index() is not None
+            and model_name(model) == self.embeddings_cache.model_name
         )
 
+    async def generate_cached_batch(self, tokenizer, model, contents: List[str]) -> np.ndarray:
+        """
+        Like `generate_batch`, but only the contents that are not in the persistent embedding cache go through the
+        model, once each. The new embeddings are added to the cache.
+        """
+        # Keyed by backend too: the int8 backends compute slightly different embeddings.
+        cache_key = model.name_or_path
+        hashes = [text_hash(content) for content in contents]
+        cached = await self.embedding_cache_repository.find_many(cache_key, list(set(hashes)))
+        missing = {}
+        for content_hash, content in zip(hashes, contents):
+            if content_hash not in cached:
+                missing[content_hash] = content
+        if missing:
+            matrix = await self.generate_batch(tokenizer, model, list(missing.values()))
+            computed = {content_hash: embedding.tobytes() for content_hash, embedding in zip(missing, matrix)}
+            await self.embedding_cache_repository.create_many([
+                CachedEmbedding(model=cache_key, content_hash=content_hash, embedding=embedding)
+                for content_hash, embedding in computed.items()
+            ])
+            cached.update(computed)
+        return np.frombuffer(
+            b"".join(cached[content_hash] for content_hash in hashes), dtype=np.float32
+        ).reshape(len(contents), -1)
+
+    async def generate_and_store_chunks(self, tokenizer, model, texts: List[MyText]) -> List[EmbeddingChunk]:
+        windows = self.split_long_texts(tokenizer, model, [text.content for text in texts])
+        if not windows:
+            return []
+        # The chunks of a batch of long texts can be many more than the texts: keep the forward passes as big as the
+        # batch.
+        matrix = np.concatenate([
+            await self.generate_windows(tokenizer, model, [window for _, _, window in windows[i:i + len(texts)]])
+            for i in range(0, len(windows), len(texts))
+        ])
+        ids = await self.embeddings_repository.get_next_chunk_ids(len(windows))
+        chunks = [
+            EmbeddingChunk(
+                id=id,
+                position=position,
+                text=OneToOne[MyText](id=texts[i].id),
+                embedding=embedding.tobytes(),
+                model=model_name(model),
+            )
+            for id, (i, position, _), embedding in zip(ids, windows, matrix)
+        ]
+        await self.embeddings_repository.create_chunks(chunks)
+        if self._serves(model):
+            self.embeddings_cache.get_index().add(np.array([chunk.text.id for chunk in chunks]), matrix)
+        return chunks
+
+    def split_long_texts(self, tokenizer, model, contents: List[str]) -> List[Tuple[int, int, List[int]]]:
+        """
+        The (content index, position, token ids) of the windows after the first one of the contents that do not fit
+        in the model input.
+        """
+        size = window_size(tokenizer, model)
+        # A token is at least one character long.
+        long = [i for i, content in enumerate(contents) if len(content) > size]
+        if not long:
+            return []
+        token_ids = tokenizer([contents[i] for i in long], add_special_tokens=False)["input_ids"]
+        return [
+            (i, position, window)
+            for i, ids in zip(long, token_ids)
+            for position, window in enumerate(
+                split_windows(ids, size, self.CHUNK_OVERLAP, self.MAX_CHUNKS)[1:], start=1
+            )
+        ]
+
+    async def generate_windows(self, tokenizer, model, windows: List[List[int]]) -> np.ndarray:
+        return embed_windows(tokenizer, model, windows)
+
     async def generate(self, tokenizer, model, content) -> np.ndarray:
-        inputs = tokenizer(
-            content, return_tensors="pt", truncation=True, padding=True
+        return (await self.generate_batch(tokenizer, model, [content]))[0]
+
+    async def generate_query(self, search: str) -> np.ndarray:
+        """
+        Embedding of a search query with the model of the cache. Popular queries are served from memory, the others go
+        through the inference executor of the cache, see `InferenceExecutor`.
+        """
+        await self.embeddings_cache.load_model()
+        model = self.embeddings_cache.get_model()
+        key = (model.name_or_path, text_hash(search))
+        query_embeddings = self.embeddings_cache.get_query_embeddings()
+        embedding = query_embeddings.get(key)
+        if embedding is None:
+            embedding = await self.embeddings_cache.get_inference().embed(search)
+            query_embeddings.put(key, embedding)
+        return embedding
+
+    async def generate_batch(self, tokenizer, model, contents: List[str]) -> np.ndarray:
+        return embed(tokenizer, model, contents)
+
+    async def find_embeddings(
+            self, text_ids: List[int], chunks: bool = True
+    ) -> Tuple[List[Embedding], List[EmbeddingChunk]]:
+        """
+        The embeddings of the model of the cache of the given texts, and with `chunks` their chunks too. The texts are
+        read `LOAD_BATCH_SIZE` at a time: each one is a bind parameter.
+        """
+        model = self.embeddings_cache.model_name
+        embeddings = []
+        embedding_chunks = []
+        for i in range(0, len(text_ids), self.LOAD_BATCH_SIZE):
+            batch = text_ids[i:i + self.LOAD_BATCH_SIZE]
+            embeddings += await self.embeddings_repository.find_by_text_ids(batch, model)
+            if chunks:
+                embedding_chunks += await self.embeddings_repository.find_chunks(model, batch)
+        return embeddings, embedding_chunks
+
+    async def load_index(self) -> None:
+        """
+        Load the embeddings and the chunks from the snapshot, if any, and read from the database only the ones of the
+        texts that are not in it.
+
+        The embeddings are written by concurrent transactions, which commit in any order, so the missing ones are told
+        by their text ids: an embedding with a lower id than the ones in the snapshot can still be committed after it.
+        """
+        snapshot = None
+        if self.embeddings_cache.snapshot_path:
+            snapshot = (
+                EmbeddingsSnapshot.load(snapshot_path(self.embeddings_cache.snapshot_path,
+                                                      self.embeddings_cache.model_name))
+                # Written before the snapshots were per model.
+                or EmbeddingsSnapshot.load(self.embeddings_cache.snapshot_path)
+            )
+            if snapshot and snapshot.model != self.embeddings_cache.model_name:
+                log.warning(
+                    "Ignoring the embeddings snapshot of %s: the search uses %s",
+                    snapshot.model, self.embeddings_cache.model_name
+                )
+                snapshot = None
+        model = self.embeddings_cache.model_name
+        quantization = self.embeddings_cache.quantization
+        parts = []
+        if snapshot:
+            # Mapped as it is when quantized like the cache, converted otherwise.
+            stored = ExactIndex(snapshot.text_ids, snapshot.matrix, normalized=True, quantization=quantization,
+                                scales=snapshot.scales)
+            text_ids = np.array(await self.embeddings_repository.list_text_ids(model), dtype=np.int64)
+            # Copies the matrix, but only if some texts were deleted since the snapshot was written.
+            stored.remove(np.setdiff1d(stored.text_ids, text_ids))
+            parts.append(stored)
+            embeddings, chunks = await self.find_embeddings(
+                np.setdiff1d(text_ids, stored.text_ids).tolist(), chunks=snapshot.chunks
+            )
+            if not snapshot.chunks:
+                chunks = await self.embeddings_repository.find_chunks(model)
+        else:
+            embeddings = await self.embeddings_repository.find_all(model)
+            chunks = await self.embeddings_repository.find_chunks(model)
+        for rows in (embeddings, chunks):
+            parts.append(ExactIndex.from_embeddings(((x.text.id, x.embedding) for x in rows),
+                                                    quantization=quantization))
+        text_ids, matrix, scales = concatenate(parts)
+        self.embeddings_cache.set_text_id_to_bug_id(await self.bugs_service.find_bug_ids_by_text_ids())
+        self.embeddings_cache.set_text_id_to_merge_proposal_id(
+            await self.merge_proposals_service.find_merge_proposal_ids_by_text_ids()
         )
-        outputs = model(**inputs)
-        embeddings = outputs.last_hidden_state.mean(dim=1)
-        return embeddings.cpu().detach().numpy()[0]
+        # Training the IVF centroids takes seconds: keep serving meanwhile.
+        self.embeddings_cache.set_index(await asyncio.to_thread(
+            self.embeddings_cache.build_index, text_ids, matrix, normalized=True, scales=scales
+        ))
 
-    async def find_similar_issues(self, search: str, limit: int) -> List[BugWithCommentsAndScores]:
-        embedding = await self.generate(self.embeddings_cache.get_tokenizer(), self.embeddings_cache.get_model(), search)
-        if not self.embeddings_cache.get_cache():
-            embeddings_cache_size = await self.embeddings_repository.list(1, 1)
-            all_embeddings = await self.embeddings_repository.list(embeddings_cache_size.total, 1)
-            self.embeddings_cache.set_cache(
-                {
-                    x.text.id: np.frombuffer(x.embedding, dtype=np.float32) for x in all_embeddings.items
-                }
+    @staticmethod
+    def refreshed_index(index: ExactIndex, deleted: np.ndarray, embeddings: List[Embedding],
+                        chunks: List[EmbeddingChunk]) -> ExactIndex:
+        """
+        A copy of `index` without the rows of the `deleted` texts and with the new `embeddings` and `chunks`. `index`
+        itself is left as it is, so that it can keep serving searches meanwhile.
+        """
+        refreshed = copy.copy(index)
+        refreshed.remove(deleted)
+        for rows in (embeddings, chunks):
+            new = ExactIndex.from_embeddings((x.text.id, x.embedding) for x in rows)
+            refreshed.add(new.text_ids, new.matrix)
+        return refreshed
+
+    async def refresh_index(self) -> None:
+        """
+        Add the embeddings of the texts that are not in the index yet and drop the ones of the deleted texts. Only the
+        database reads run on the event loop: the new index is built in a thread, from a copy of the current one, and
+        replaces it when complete, so searches in flight are not affected.
+        """
+        async with self.embeddings_cache.lock:
+            index = self.embeddings_cache.get_index()
+            if index is None:
+                await self.load_index()
+                return
+            text_ids = np.array(
+                await self.embeddings_repository.list_text_ids(self.embeddings_cache.model_name), dtype=np.int64
+            )
+            # The text ids, not the embedding ids: the embeddings are written by concurrent transactions, which commit
+            # in any order. The texts never change, so neither do their embeddings.
+            deleted = np.setdiff1d(index.text_ids, text_ids)
+            missing = np.setdiff1d(text_ids, index.text_ids).tolist()
+            if not missing and not len(deleted):
+                return
+            embeddings, chunks = await self.find_embeddings(missing)
+            text_id_to_bug_id = {}
+            text_id_to_merge_proposal_id = {}
+            for i in range(0, len(missing), self.LOAD_BATCH_SIZE):
+                batch = missing[i:i + self.LOAD_BATCH_SIZE]
+                text_id_to_bug_id.update(await self.bugs_service.find_bug_ids_by_text_ids(batch))
+                text_id_to_merge_proposal_id.update(
+                    await self.merge_proposals_service.find_merge_proposal_ids_by_text_ids(batch)
+                )
+            refreshed = await asyncio.to_thread(self.refreshed_index, index, deleted, embeddings, chunks)
+
+            for owners, new_owners in (
+                    (self.embeddings_cache.get_text_id_to_bug_id(), text_id_to_bug_id),
+                    (self.embeddings_cache.get_text_id_to_merge_proposal_id(), text_id_to_merge_proposal_id),
+            ):
+                for text_id in deleted.tolist():
+                    owners.pop(text_id, None)
+                owners.update(new_owners)
+            self.embeddings_cache.set_index(refreshed)
+
+    async def write_snapshot(self, path: str, model: str = MODEL_NAME, batch_size: int = 10000,
+                             quantization: str = FLOAT32) -> None:
+        """
+        Dump all the embeddings of `model` and their chunks to a snapshot the server can load without scanning the
+        `embedding` and `embedding_chunk` tables.
+        """
+        size, version = await self.embeddings_repository.get_size_and_max_id(model)
+        chunks_size = await self.embeddings_repository.get_chunks_size(model)
+        writer = EmbeddingsSnapshotWriter(path, size + chunks_size, version, quantization=quantization, model=model)
+
+        def arrays(rows: List[Embedding] | List[EmbeddingChunk]) -> Tuple[np.ndarray, np.ndarray]:
+            return (
+                np.array([row.text.id for row in rows], dtype=np.int64),
+                np.frombuffer(b"".join(row.embedding for row in rows), dtype=np.float32).reshape(len(rows), -1)
             )
 
-        scores = sorted(
-            ((self.cosine_similarity(embedding, e), text_id)
-             for text_id, e in self.embeddings_cache.get_cache().items()),
+        written = [np.empty(0, dtype=np.int64)]
+        async for embeddings in self.embeddings_repository.stream(version, batch_size, model):
+            text_ids, matrix = arrays(embeddings)
+            writer.append(text_ids, matrix)
+            written.append(text_ids)
+        written = np.concatenate(written)
+        # A text and its chunks are committed together, but the transactions committed between the two reads are only
+        # seen by the second one: the chunks of the texts that are not in the snapshot are read with their embedding on
+        # load instead.
+        async for chunks in self.embeddings_repository.stream_chunks(batch_size, model):
+            text_ids, matrix = arrays(chunks)
+            keep = np.isin(text_ids, written)
+            if keep.any():
+                writer.append(text_ids[keep], matrix[keep])
+        writer.commit()
+
+    async def rerank(self, index: ExactIndex, embedding: np.ndarray,
+                     results: List[Tuple[int, float]]) -> List[Tuple[int, float]]:
+        """
+        If the index is quantized, score again the best `rerank` of the `results` with the full precision embeddings
+        from the database. Only their order changes: the results after them keep the approximate order.
+        """
+        rerank = self.embeddings_cache.rerank
+        if index.quantization == FLOAT32 or rerank <= 0:
+            return results
+        head = [text_id for text_id, _ in results[:rerank]]
+        exact = ExactIndex.from_embeddings(
+            (x.text.id, x.embedding)
+            for x in [
+                *await self.embeddings_repository.find_by_text_ids(head, self.embeddings_cache.model_name),
+                *await self.embeddings_repository.find_chunks(self.embeddings_cache.model_name, head)
+            ]
+        )
+        scores = exact.similarities(embedding, head)
+        reranked = sorted(
+            ((text_id, scores.get(text_id, score)) for text_id, score in results[:rerank]),
+            key=lambda result: result[1],
             reverse=True
         )
+        return reranked + results[rerank:]
 
-        unique_bugs = {}
-        for similarity, text_id in scores:
-            bug = await self.bugs_service.find_bug_by_text_id(text_id)
-            unique_bugs[bug.id] = bug
-            if len(unique_bugs.keys()) == limit:
+    async def get_or_load_index(self) -> ExactIndex:
+        if self.embeddings_cache.get_index() is None:
+            async with self.embeddings_cache.lock:
+                if self.embeddings_cache.get_index() is None:
+                    await self.load_index()
+        return self.embeddings_cache.get_index()
+
+    async def find_owners(
+            self,
+            index: ExactIndex,
+            embedding: np.ndarray,
+            limit: int,
+            text_id_to_owner_id: Dict[int, int],
+            find_owner_ids: Callable[[List[int]], Awaitable[Dict[int, int]]],
+            others: Dict[int, int],
+    ) -> Dict[int, float]:
+        """
+        The best `limit` owners (bugs or MPs) of the texts similar to `embedding`, best first, with the score of their
+        best text. Bugs and MPs share the index: the texts of the other kind, in `others`, are skipped.
+        """
+        # The texts looked up that have no owner, so that a wider search does not look them up again.
+        misses = set()
+        candidates = limit * self.CANDIDATES_PER_BUG
+        while True:
+            # The approximate scores are enough to pick the candidates, they are re-ranked once at the end.
+            results = index.search(embedding, candidates)
+            unknown = [
+                text_id for text_id, _ in results
+                if text_id not in text_id_to_owner_id and text_id not in others and text_id not in misses
+            ]
+            if unknown:
+                found = await find_owner_ids(unknown)
+                text_id_to_owner_id.update(found)
+                misses.update(text_id for text_id in unknown if text_id not in found)
+            covered = {text_id_to_owner_id[text_id] for text_id, _ in results if text_id in text_id_to_owner_id}
+            # Widen the search only if the best candidates did not cover enough owners.
+            if len(covered) >= limit or candidates >= len(index):
                 break
+            candidates *= 2
+        owners = {}
+        for text_id, score in await self.rerank(index, embedding, results):
+            if text_id in text_id_to_owner_id:
+                # Dicts keep the insertion order: the best owners come first.
+                owners.setdefault(text_id_to_owner_id[text_id], score)
+                if len(owners) == limit:
+                    break
+        return owners
 
+    async def find_similar_issues(self, search: str, limit: int) -> List[BugWithCommentsAndScores]:
+        embedding = await self.generate_query(search)
+        index = await self.get_or_load_index()
+        bug_ids = await self.find_owners(
+            index,
+            embedding,
+            limit,
+            self.embeddings_cache.get_text_id_to_bug_id(),
+            self.bugs_service.find_bug_ids_by_text_ids,
+            self.embeddings_cache.get_text_id_to_merge_proposal_id(),
+        )
+
+        bug_ids = list(bug_ids)
+        bugs = {bug.id: bug for bug in await self.bugs_service.find_bugs_by_ids(bug_ids)}
+        comments = await self.bugs_service.get_bugs_comments(bug_ids)
         matching_issues = []
-        text_id_to_score = {text_id: score for score, text_id in scores}
-        for bug in unique_bugs.values():
-            bug_comments = await self.bugs_service.get_bug_comments(bug.id)
+        for bug_id in bug_ids:
+            if bug_id not in bugs:
+                continue
+            bug = bugs[bug_id]
+            bug_comments = comments.get(bug_id, [])
+            text_id_to_score = index.similarities(
+                embedding,
+                [bug.title.id, bug.description.id] + [bug_comment.text.id for bug_comment in bug_comments]
+            )
             bug_with_score = BugWithCommentsAndScores(
                 bug=bug,
-                title_score=text_id_to_score[bug.title.id],
-                description_score=text_id_to_score[bug.description.id],
+                title_score=text_id_to_score.get(bug.title.id, 0.0),
+                description_score=text_id_to_score.get(bug.description.id, 0.0),
                 comments=[
                     BugCommentWithScore(
                         bug_comment=bug_comment,
-                        score=text_id_to_score[bug_comment.text.id],
+                        score=text_id_to_score.get(bug_comment.text.id, 0.0),
                     )
                     for bug_comment in bug_comments
                 ]
             )
             matching_issues.append(bug_with_score)
         return matching_issues
+
+    async def find_similar_merge_proposals(self, search: str, limit: int) -> List[MergeProposalWithScore]:
+        """
+        The MPs whose commit message or description are the most similar to `search`, scored by the best of the two.
+        """
+        embedding = await self.generate_query(search)
+        index = await self.get_or_load_index()
+        scores = await self.find_owners(
+            index,
+            embedding,
+            limit,
+            self.embeddings_cache.get_text_id_to_merge_proposal_id(),
+            self.merge_proposals_service.find_merge_proposal_ids_by_text_ids,
+            self.embeddings_cache.get_text_id_to_bug_id(),
+        )
+        merge_proposals = {
+            merge_proposal.id: merge_proposal
+            for merge_proposal in await self.merge_proposals_service.find_merge_proposals_by_ids(list(scores))
+        }
+        return [
+            MergeProposalWithScore(merge_proposal=merge_proposals[merge_proposal_id], score=score)
+            for merge_proposal_id, score in scores.items()
+            if merge_proposal_id in merge_proposals
+        ]
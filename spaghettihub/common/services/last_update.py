@@ -8,7 +8,10 @@ from spaghettihub.common.services.base import Service
 
 
 class LastUpdateService(Service):
-    ROW_ID = 1
+    """
+    The watermarks of the incremental imports: every `source`, e.g. the bugs of a Launchpad project, records when it
+    was last imported successfully, and the next import only fetches what changed since then.
+    """
 
     def __init__(
             self,
@@ -18,13 +21,14 @@ class LastUpdateService(Service):
         super().__init__(connection_provider)
         self.last_update_repository = last_update_repository
 
-    async def get_last_update(self) -> Optional[LastUpdate]:
-        return await self.last_update_repository.find_by_id(self.ROW_ID)
+    async def get_last_update(self, source: str) -> Optional[LastUpdate]:
+        return await self.last_update_repository.find_by_source(source)
 
-    async def set_last_update(self, time: datetime) -> None:
-        last_update = await self.get_last_update()
+    async def set_last_update(self, source: str, time: datetime) -> LastUpdate:
+        last_update = await self.get_last_update(source)
         if not last_update:
             return await self.last_update_repository.create(
-                LastUpdate(id=self.ROW_ID, last_updated=time)
+                LastUpdate(id=await self.last_update_repository.get_next_id(), source=source, last_updated=time)
             )
         last_update.last_updated = time
+        return await self.last_update_repository.update(last_update)
@@ -1,10 +1,16 @@
 from datetime import datetime
+from typing import Dict, List, Tuple
 
 from spaghettihub.common.db.base import ConnectionProvider
 from spaghettihub.common.db.merge_proposals import MergeProposalsRepository
-from spaghettihub.common.models.base import ListResult
-from spaghettihub.common.models.merge_proposals import MergeProposal
+from spaghettihub.common.llm.cache import text_hash
+from spaghettihub.common.models.base import ListResult, OneToOne
+from spaghettihub.common.models.merge_proposals import (
+    LaunchpadMergeProposal, MergeProposal, MergeProposalSearchMode,
+    MergeProposalSearchOrder)
+from spaghettihub.common.models.texts import MyText
 from spaghettihub.common.services.base import Service
+from spaghettihub.common.services.texts import TextsService
 
 
 class MergeProposalsService(Service):
@@ -13,9 +19,11 @@ class MergeProposalsService(Service):
             self,
             connection_provider: ConnectionProvider,
             merge_proposals_repository: MergeProposalsRepository,
+            texts_service: TextsService,
     ):
         super().__init__(connection_provider)
         self.merge_proposals_repository = merge_proposals_repository
+        self.texts_service = texts_service
 
     async def create(self,
                      commit_message: str | None,
@@ -36,5 +44,102 @@ class MergeProposalsService(Service):
             )
         )
 
-    async def find_merge_proposals_contain_message(self, message: str, page: int, size: int) -> ListResult[MergeProposal]:
-        return await self.merge_proposals_repository.find_by_commit_message_match(message, page, size)
+    async def process_launchpad_merge_proposals(self, lp_merge_proposals: List[LaunchpadMergeProposal]) -> List[MyText]:
+        """
+        Store the MPs with a single multi-row INSERT, and return the texts created for their commit messages and
+        descriptions: the ones to embed. An MP already stored, with the same web link, is updated instead, and its
+        texts are replaced only if their content changed, so that the others keep their embeddings.
+        """
+        # The last copy of an MP wins, an INSERT ... ON CONFLICT cannot update the same row twice.
+        lp_merge_proposals = list({mp.web_link: mp for mp in lp_merge_proposals}.values())
+        if not lp_merge_proposals:
+            return []
+        merge_proposals = await self.merge_proposals_repository.find_by_web_links(
+            [lp_merge_proposal.web_link for lp_merge_proposal in lp_merge_proposals]
+        )
+        hashes = await self.texts_service.find_content_hashes([
+            text.id
+            for merge_proposal in merge_proposals.values()
+            for text in (merge_proposal.commit_message_text, merge_proposal.description_text)
+            if text
+        ])
+
+        new_texts: List[MyText] = []
+        stale_text_ids = []
+        # The text of each (web link, field), the new ones get their id once they are all allocated.
+        texts: Dict[Tuple[str, str], MyText | int] = {}
+        for lp_merge_proposal in lp_merge_proposals:
+            merge_proposal = merge_proposals.get(lp_merge_proposal.web_link)
+            for field, content in (
+                    ("commit_message_text", lp_merge_proposal.commit_message),
+                    ("description_text", lp_merge_proposal.description),
+            ):
+                text = getattr(merge_proposal, field) if merge_proposal else None
+                if text and content and hashes.get(text.id) == text_hash(content):
+                    texts[(lp_merge_proposal.web_link, field)] = text.id
+                    continue
+                if text:
+                    stale_text_ids.append(text.id)
+                if content:
+                    new_text = MyText(id=0, content=content, content_hash=text_hash(content))
+                    new_texts.append(new_text)
+                    texts[(lp_merge_proposal.web_link, field)] = new_text
+
+        if new_texts:
+            for text, text_id in zip(new_texts, await self.texts_service.get_next_ids(len(new_texts))):
+                text.id = text_id
+            await self.texts_service.create_many(new_texts)
+
+        def text_ref(web_link: str, field: str) -> OneToOne[MyText] | None:
+            text = texts.get((web_link, field))
+            if text is None:
+                return None
+            return OneToOne[MyText](id=text if isinstance(text, int) else text.id)
+
+        ids = await self.merge_proposals_repository.get_next_ids(len(lp_merge_proposals))
+        await self.merge_proposals_repository.upsert_many([
+            MergeProposal(
+                id=id,
+                commit_message=lp_merge_proposal.commit_message,
+                date_merged=lp_merge_proposal.date_merged,
+                source_git_path=lp_merge_proposal.source_git_path,
+                target_git_path=lp_merge_proposal.target_git_path,
+                registrant_name=lp_merge_proposal.registrant_name,
+                web_link=lp_merge_proposal.web_link,
+                description=lp_merge_proposal.description,
+                commit_message_text=text_ref(lp_merge_proposal.web_link, "commit_message_text"),
+                description_text=text_ref(lp_merge_proposal.web_link, "description_text"),
+            )
+            for id, lp_merge_proposal in zip(ids, lp_merge_proposals)
+        ])
+        # Only once the MPs refer to their new texts. Their embeddings are cascaded.
+        await self.texts_service.delete_many(stale_text_ids)
+        return new_texts
+
+    async def find_merge_proposals_by_ids(self, ids: List[int]) -> List[MergeProposal]:
+        return await self.merge_proposals_repository.find_by_ids(ids)
+
+    async def find_merge_proposal_ids_by_text_ids(self, text_ids: List[int] | None = None) -> Dict[int, int]:
+        return await self.merge_proposals_repository.find_merge_proposal_ids_by_text_ids(text_ids)
+
+    async def find_merge_proposals_contain_message(
+            self, message: str, page: int, size: int, cursor: str | None = None
+    ) -> ListResult[MergeProposal]:
+        return await self.merge_proposals_repository.find_by_commit_message_match(message, page, size, cursor)
+
+    async def search_merge_proposals(
+            self,
+            query: str,
+            mode: MergeProposalSearchMode,
+            order: MergeProposalSearchOrder,
+            page: int,
+            size: int,
+            cursor: str | None = None
+    ) -> ListResult[MergeProposal]:
+        if mode == MergeProposalSearchMode.SUBSTRING:
+            # There is no relevance for a substring match.
+            return await self.merge_proposals_repository.find_by_commit_message_match(query, page, size, cursor)
+        if not query.strip():
+            # A blank query has no words to look for: like the empty substring, it lists all the MPs.
+            return await self.merge_proposals_repository.find_by_commit_message_match("", page, size, cursor)
+        return await self.merge_proposals_repository.find_by_commit_message_search(query, order, page, size, cursor)
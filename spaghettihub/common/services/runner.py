@@ -10,10 +10,13 @@ from temporalio.service import RPCError
 from spaghettihub.common.db.base import ConnectionProvider
 from spaghettihub.common.db.maas import MAASRepository
 from spaghettihub.common.models.maas import MAAS
-from spaghettihub.common.models.runner import GithubWebhook, WorkflowAction, GithubPushWebhook, WorkflowJob
+from spaghettihub.common.models.runner import (GithubPushWebhook,
+                                               GithubWebhook, WorkflowAction,
+                                               WorkflowJob)
 from spaghettihub.common.services.base import Service
 from spaghettihub.common.workflows.constants import TASK_QUEUE_NAME
-from spaghettihub.common.workflows.runner.params import TemporalGithubRunnerWorkflowParams
+from spaghettihub.common.workflows.runner.params import \
+    TemporalGithubRunnerWorkflowParams
 
 log = logging.getLogger()
 
@@ -36,8 +39,8 @@ class GithubWorkflowRunnerService(Service):
         self.maas_repository = maas_repository
         self.temporal_client = temporal_client
 
-    async def list_commits(self, query: str | None, page: int, size: int):
-        return await self.maas_repository.list_commits(query, page, size)
+    async def list_commits(self, query: str | None, page: int, size: int, cursor: str | None = None):
+        return await self.maas_repository.list_commits(query, page, size, cursor)
 
     async def list(self, page: int, size: int):
         pass
@@ -1,7 +1,8 @@
-from typing import List
+from typing import AsyncIterator, Dict, List
 
 from spaghettihub.common.db.base import ConnectionProvider
 from spaghettihub.common.db.texts import TextsRepository
+from spaghettihub.common.llm.cache import text_hash
 from spaghettihub.common.models.texts import MyText
 from spaghettihub.common.services.base import Service
 
@@ -16,11 +17,31 @@ class TextsService(Service):
 
     async def create(self, text: str) -> MyText:
         return await self.texts_repository.create(
-            MyText(id=await self.texts_repository.get_next_id(), content=text)
+            MyText(id=await self.texts_repository.get_next_id(), content=text, content_hash=text_hash(text))
         )
 
+    async def get_next_ids(self, size: int) -> List[int]:
+        return await self.texts_repository.get_next_ids(size)
+
+    async def create_many(self, texts: List[MyText]) -> None:
+        return await self.texts_repository.create_many(texts)
+
     async def delete(self, id: int) -> None:
         return await self.texts_repository.delete(id)
 
-    async def find_texts_without_embeddings(self) -> List[MyText]:
-        return await self.texts_repository.find_texts_without_embeddings()
+    async def delete_many(self, ids: List[int]) -> None:
+        return await self.texts_repository.delete_many(ids)
+
+    async def find_content_hashes(self, ids: List[int]) -> Dict[int, str]:
+        return await self.texts_repository.find_content_hashes(ids)
+
+    async def find_texts_without_embeddings(self, model: str) -> List[MyText]:
+        return await self.texts_repository.find_texts_without_embeddings(model)
+
+    async def count_texts_without_embeddings(self, model: str) -> int:
+        return await self.texts_repository.count_texts_without_embeddings(model)
+
+    def stream_texts_without_embeddings(
+            self, model: str, batch_size: int, after_id: int = 0
+    ) -> AsyncIterator[List[MyText]]:
+        return self.texts_repository.stream_texts_without_embeddings(model, batch_size, after_id)
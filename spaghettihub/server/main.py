@@ -1,13 +1,21 @@
 import argparse
 import asyncio
 import logging
+from contextlib import asynccontextmanager
 
 import uvicorn
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 from starlette.middleware.sessions import SessionMiddleware
 from temporalio.client import Client
-from transformers import AutoModel, AutoTokenizer
 
+from spaghettihub.common.db.base import ConnectionProvider
+from spaghettihub.common.db.pagination import InvalidCursor
+from spaghettihub.common.llm.index import (FLOAT32, INDEX_KINDS, QUANTIZATIONS,
+                                           ExactIndex)
+from spaghettihub.common.llm.inference import InferenceUnavailable
+from spaghettihub.common.llm.registry import BACKENDS, MODEL_NAME, TORCH
+from spaghettihub.common.services.collection import ServiceCollection
 from spaghettihub.common.services.embeddings import EmbeddingsCache
 from spaghettihub.server.base.api.handlers import APIBase
 from spaghettihub.server.base.db.database import Database
@@ -57,30 +65,144 @@ def make_arg_parser():
                         type=str,
                         required=True,
                         help="Set the webhook secret")
+    parser.add_argument("--search-index",
+                        type=str,
+                        default=ExactIndex.KIND,
+                        choices=list(INDEX_KINDS),
+                        help="The index used to search the bug embeddings. 'ivf' is approximate and faster on big "
+                             "corpora")
+    parser.add_argument("--search-index-path",
+                        type=nullable_str,
+                        default=None,
+                        help="Where to persist the search index, so that it is not rebuilt at every start: the index of the "
+                             "search model is written to <path>.<model>")
+    parser.add_argument("--search-nprobe",
+                        type=int,
+                        default=16,
+                        help="Number of clusters scanned by the 'ivf' index: higher is slower with a better recall")
+    parser.add_argument("--embeddings-snapshot-path",
+                        type=nullable_str,
+                        default=None,
+                        help="The --snapshot-path of spaghettihubtraining: the snapshot of the search model is read "
+                             "from <path>.<model>")
+    parser.add_argument("--embeddings-refresh-interval",
+                        type=int,
+                        default=600,
+                        help="Seconds between two refreshes of the search index with the new embeddings. 0 disables "
+                             "the refresh")
+    parser.add_argument("--query-cache-size",
+                        type=int,
+                        default=1024,
+                        help="Number of search query embeddings kept in memory")
+    parser.add_argument("--embeddings-quantization",
+                        type=str,
+                        default=FLOAT32,
+                        choices=list(QUANTIZATIONS),
+                        help="How the embeddings are stored in memory. 'int8' divides the memory of the search index by "
+                             "four with slightly approximate scores. 'float16' halves it, but the exact search is "
+                             "about three times slower")
+    parser.add_argument("--search-rerank",
+                        type=int,
+                        default=200,
+                        help="Number of best results of a search on quantized embeddings that are scored again in full "
+                             "precision. 0 disables the re-ranking")
+    parser.add_argument("--inference-batch-size",
+                        type=int,
+                        default=16,
+                        help="Maximum number of concurrent search queries embedded in a single forward pass")
+    parser.add_argument("--inference-queue-size",
+                        type=int,
+                        default=64,
+                        help="Maximum number of search queries waiting for the model. The searches beyond it are "
+                             "rejected with a 503")
+    parser.add_argument("--inference-timeout",
+                        type=float,
+                        default=10.0,
+                        help="Seconds a search query can wait for its embedding before being rejected with a 503")
+    parser.add_argument("--embeddings-model",
+                        type=str,
+                        default=MODEL_NAME,
+                        help="The model embedding the search queries, whose embeddings are searched. They must have been "
+                             "computed with spaghettihubtraining --model. The snapshot and the persisted index must "
+                             "be the ones of this model")
+    parser.add_argument("--inference-backend",
+                        type=str,
+                        default=TORCH,
+                        choices=BACKENDS,
+                        help="How the search queries are embedded. The 'onnx' backends require onnxruntime and export "
+                             "the model at the first search. The int8 backends are the fastest, with slightly "
+                             "approximate embeddings: check them with benchmarks/backend_parity.py")
     return parser
 
 
+async def refresh_embeddings(db: Database, embeddings_cache: EmbeddingsCache, interval: int):
+    """Keep the search index in sync with the database, loading it the first time."""
+    while True:
+        try:
+            async with db.engine.connect() as conn:
+                async with conn.begin():
+                    services = ServiceCollection.produce(
+                        ConnectionProvider(current_connection=conn), embeddings_cache=embeddings_cache
+                    )
+                    await services.embeddings_service.refresh_index()
+        except Exception:
+            logging.exception("Failed to refresh the embeddings")
+        await asyncio.sleep(interval)
+
+
 async def create_app(config: Config) -> FastAPI:
     """Create the FastAPI application."""
 
     db = Database(config.db, echo=config.debug_queries)
 
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        refresh_task = None
+        if config.embeddings_refresh_interval:
+            refresh_task = asyncio.create_task(
+                refresh_embeddings(db, embeddings_cache, config.embeddings_refresh_interval)
+            )
+        yield
+        if refresh_task:
+            refresh_task.cancel()
+        await embeddings_cache.get_inference().close()
+
     app = FastAPI(
         title="Spaghetti Hub",
         name="My Spaghetti Hub tools",
         # The SwaggerUI page is provided by the APICommon router.
         docs_url=None,
+        lifespan=lifespan,
     )
 
+    @app.exception_handler(InvalidCursor)
+    async def invalid_cursor_handler(request: Request, exc: InvalidCursor):
+        return JSONResponse(status_code=400, content={"detail": str(exc)})
+
+    @app.exception_handler(InferenceUnavailable)
+    async def inference_unavailable_handler(request: Request, exc: InferenceUnavailable):
+        return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "1"})
+
     # The order here is important: the exception middleware must be the first one being executed (i.e. it must be the last
     # middleware added here)
     embeddings_cache = EmbeddingsCache(
-        model=AutoModel.from_pretrained("BAAI/bge-large-en-v1.5"),
-        tokenizer=AutoTokenizer.from_pretrained("BAAI/bge-large-en-v1.5")
+        model_name=config.embeddings_model,
+        backend=config.inference_backend,
+        index_kind=config.search_index,
+        index_path=config.search_index_path,
+        nprobe=config.search_nprobe,
+        snapshot_path=config.embeddings_snapshot_path,
+        query_cache_size=config.query_cache_size,
+        quantization=config.embeddings_quantization,
+        rerank=config.search_rerank,
+        inference_batch_size=config.inference_batch_size,
+        inference_queue_size=config.inference_queue_size,
+        inference_timeout=config.inference_timeout
     )
 
     temporal_client = await Client.connect("localhost:7233")
-    app.add_middleware(ServicesV1Middleware, embeddings_cache=embeddings_cache, webhook_secret=config.webhook_secret, temporal_client=temporal_client)
+    app.add_middleware(ServicesV1Middleware, embeddings_cache=embeddings_cache,
+                       webhook_secret=config.webhook_secret, temporal_client=temporal_client)
     app.add_middleware(TransactionMiddleware, db=db)
     app.add_middleware(
         SessionMiddleware,
@@ -98,7 +220,23 @@ def run():
     args = parser.parse_args()
 
     loop = asyncio.new_event_loop()
-    app_config = read_config(secret=args.secret, webhook_secret=args.webhook_secret)
+    app_config = read_config(
+        secret=args.secret,
+        webhook_secret=args.webhook_secret,
+        search_index=args.search_index,
+        search_index_path=args.search_index_path,
+        search_nprobe=args.search_nprobe,
+        embeddings_snapshot_path=args.embeddings_snapshot_path,
+        embeddings_refresh_interval=args.embeddings_refresh_interval,
+        query_cache_size=args.query_cache_size,
+        embeddings_quantization=args.embeddings_quantization,
+        search_rerank=args.search_rerank,
+        inference_batch_size=args.inference_batch_size,
+        inference_queue_size=args.inference_queue_size,
+        inference_timeout=args.inference_timeout,
+        inference_backend=args.inference_backend,
+        embeddings_model=args.embeddings_model
+    )
     logging.basicConfig(
         level=logging.INFO
     )
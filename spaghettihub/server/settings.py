@@ -2,6 +2,9 @@ from dataclasses import dataclass
 
 from sqlalchemy import URL
 
+from spaghettihub.common.llm.index import FLOAT32, ExactIndex
+from spaghettihub.common.llm.registry import MODEL_NAME, TORCH
+
 
 @dataclass
 class DatabaseConfig:
@@ -30,9 +33,28 @@ class Config:
     webhook_secret: str | None = None
     debug_queries: bool = False
     debug: bool = False
+    search_index: str = ExactIndex.KIND
+    search_index_path: str | None = None
+    search_nprobe: int = 16
+    embeddings_snapshot_path: str | None = None
+    embeddings_refresh_interval: int = 600
+    query_cache_size: int = 1024
+    embeddings_quantization: str = FLOAT32
+    search_rerank: int = 200
+    inference_batch_size: int = 16
+    inference_queue_size: int = 64
+    inference_timeout: float = 10.0
+    inference_backend: str = TORCH
+    embeddings_model: str = MODEL_NAME
 
 
-def read_config(secret: str | None = None, webhook_secret: str | None = None) -> Config:
+def read_config(secret: str | None = None, webhook_secret: str | None = None, search_index: str = ExactIndex.KIND,
+                search_index_path: str | None = None, search_nprobe: int = 16,
+                embeddings_snapshot_path: str | None = None, embeddings_refresh_interval: int = 600,
+                query_cache_size: int = 1024, embeddings_quantization: str = FLOAT32,
+                search_rerank: int = 200, inference_batch_size: int = 16, inference_queue_size: int = 64,
+                inference_timeout: float = 10.0, inference_backend: str = TORCH,
+                embeddings_model: str = MODEL_NAME) -> Config:
     return Config(
         # TODO: do not hardcode this
         DatabaseConfig(
@@ -45,4 +67,17 @@ def read_config(secret: str | None = None, webhook_secret: str | None = None) ->
         secret=secret,
         webhook_secret=webhook_secret,
         debug_queries=False,
-        debug=False)
+        debug=False,
+        search_index=search_index,
+        search_index_path=search_index_path,
+        search_nprobe=search_nprobe,
+        embeddings_snapshot_path=embeddings_snapshot_path,
+        embeddings_refresh_interval=embeddings_refresh_interval,
+        query_cache_size=query_cache_size,
+        embeddings_quantization=embeddings_quantization,
+        search_rerank=search_rerank,
+        inference_batch_size=inference_batch_size,
+        inference_queue_size=inference_queue_size,
+        inference_timeout=inference_timeout,
+        inference_backend=inference_backend,
+        embeddings_model=embeddings_model)
@@ -5,8 +5,9 @@ from starlette.templating import Jinja2Templates
 
 from spaghettihub.common.services.collection import ServiceCollection
 from spaghettihub.server.base.api.base import Handler, handler
-from spaghettihub.server.v1.api import services
-from spaghettihub.server.v1.api.models.requests.base import PaginationParams, QuerySearchParam
+from spaghettihub.server.v1.api import authenticated, services
+from spaghettihub.server.v1.api.models.requests.base import (PaginationParams,
+                                                             QuerySearchParam)
 
 templates_path = Path(__file__).resolve().parent.parent / 'templates'
 templates = Jinja2Templates(directory=str(templates_path))
@@ -57,3 +58,20 @@ class BugsHandler(Handler):
                           "query": search.query,
                           "size": pagination_params.size}
         )
+
+    @handler(
+        path="/bugs:refresh",
+        methods=["POST"],
+        tags=TAGS,
+        response_model_exclude_none=True,
+        status_code=204,
+        dependencies=[Depends(authenticated)]
+    )
+    async def refresh_bugs_index(
+            self,
+            services: ServiceCollection = Depends(services),
+    ):
+        """
+        Load the new embeddings in the search index now, without waiting for the periodic refresh.
+        """
+        await services.embeddings_service.refresh_index()
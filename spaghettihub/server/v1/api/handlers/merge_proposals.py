@@ -6,7 +6,10 @@ from starlette.templating import Jinja2Templates
 from spaghettihub.common.services.collection import ServiceCollection
 from spaghettihub.server.base.api.base import Handler, handler
 from spaghettihub.server.v1.api import services
-from spaghettihub.server.v1.api.models.requests.base import PaginationParams, QuerySearchParam
+from spaghettihub.server.v1.api.models.requests.base import (PaginationParams,
+                                                             QuerySearchParam)
+from spaghettihub.server.v1.api.models.requests.merge_proposals import \
+    MergeProposalSearchParams
 from spaghettihub.server.v1.api.models.responses.merge_proposals import (
     MergeProposalResponse, MergeProposalsListResponse)
 
@@ -33,7 +36,7 @@ class MergeProposalsHandler(Handler):
         return templates.TemplateResponse(
             "merge_proposals.html", {
                 "request": request, "user": request.session.get("username", None), "size": 5,
-                "query": ""}
+                "query": "", "mode": "substring", "order": "relevance"}
         )
 
     @handler(
@@ -49,18 +52,25 @@ class MergeProposalsHandler(Handler):
             services: ServiceCollection = Depends(services),
             pagination_params: PaginationParams = Depends(),
             message_query_param: QuerySearchParam = Depends(),
+            search_params: MergeProposalSearchParams = Depends(),
     ):
-        merge_proposals = await services.merge_proposals_service.find_merge_proposals_contain_message(
+        merge_proposals = await services.merge_proposals_service.search_merge_proposals(
             message_query_param.query,
+            search_params.mode,
+            search_params.order,
             pagination_params.page,
-            pagination_params.size
+            pagination_params.size,
+            pagination_params.cursor
         )
         return templates.TemplateResponse(
             "merge_proposals.html", {"request": request,
                                      "user": request.session.get("username", None),
                                      "results": merge_proposals.items,
                                      "query": message_query_param.query,
-                                     "size": pagination_params.size}
+                                     "mode": search_params.mode.value,
+                                     "order": search_params.order.value,
+                                     "size": pagination_params.size,
+                                     "next_cursor": merge_proposals.next_cursor}
         )
 
     @handler(
@@ -80,11 +90,15 @@ class MergeProposalsHandler(Handler):
             services: ServiceCollection = Depends(services),
             pagination_params: PaginationParams = Depends(),
             message_query_param: QuerySearchParam = Depends(),
+            search_params: MergeProposalSearchParams = Depends(),
     ) -> MergeProposalsListResponse:
-        merge_proposals = await services.merge_proposals_service.find_merge_proposals_contain_message(
-            message_query_param.message,
+        merge_proposals = await services.merge_proposals_service.search_merge_proposals(
+            message_query_param.query,
+            search_params.mode,
+            search_params.order,
             pagination_params.page,
-            pagination_params.size
+            pagination_params.size,
+            pagination_params.cursor
         )
         return MergeProposalsListResponse(
             items=[
@@ -92,4 +106,38 @@ class MergeProposalsHandler(Handler):
                 for merge_proposal in merge_proposals.items
             ],
             total=merge_proposals.total,
+            next_cursor=merge_proposals.next_cursor,
+        )
+
+    @handler(
+        path="/merge_proposals:semantic_search",
+        methods=["GET"],
+        tags=TAGS,
+        responses={
+            200: {
+                "model": MergeProposalsListResponse,
+            }
+        },
+        response_model_exclude_none=True,
+        status_code=200,
+    )
+    async def find_similar_merge_proposals(
+            self,
+            services: ServiceCollection = Depends(services),
+            pagination_params: PaginationParams = Depends(),
+            search: QuerySearchParam = Depends(),
+    ) -> MergeProposalsListResponse:
+        """
+        The MPs whose commit message or description are the most similar to the query, e.g. a bug title, best first.
+        Only the first `size` results are returned.
+        """
+        merge_proposals = await services.embeddings_service.find_similar_merge_proposals(
+            search.query, pagination_params.size
+        )
+        return MergeProposalsListResponse(
+            items=[
+                MergeProposalResponse.from_model(entity=result.merge_proposal, score=result.score)
+                for result in merge_proposals
+            ],
+            total=len(merge_proposals),
         )
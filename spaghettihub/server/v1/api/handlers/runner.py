@@ -3,11 +3,12 @@ from pathlib import Path
 from fastapi import Depends, Request
 from starlette.templating import Jinja2Templates
 
-from spaghettihub.common.models.runner import GithubWebhook, GithubPushWebhook
+from spaghettihub.common.models.runner import GithubPushWebhook, GithubWebhook
 from spaghettihub.common.services.collection import ServiceCollection
 from spaghettihub.server.base.api.base import Handler, handler
 from spaghettihub.server.v1.api import services
-from spaghettihub.server.v1.api.models.requests.base import PaginationParams, QuerySearchParam
+from spaghettihub.server.v1.api.models.requests.base import (PaginationParams,
+                                                             QuerySearchParam)
 
 templates_path = Path(__file__).resolve().parent.parent / 'templates'
 templates = Jinja2Templates(directory=str(templates_path))
@@ -68,10 +69,11 @@ class GithubWorkflowRunnerHandler(Handler):
         )
         return templates.TemplateResponse(
             "commits.html", {"request": request,
-                                     "user": request.session.get("username", None),
-                                     "results": commits.items,
-                                     "query": "",
-                                     "size": 10}
+                             "user": request.session.get("username", None),
+                             "results": commits.items,
+                             "query": "",
+                             "size": 10,
+                             "next_cursor": commits.next_cursor}
         )
 
     @handler(
@@ -82,23 +84,25 @@ class GithubWorkflowRunnerHandler(Handler):
         status_code=200,
     )
     async def get_commits_search(self,
-                          request: Request,
-                          services: ServiceCollection = Depends(services),
-                          pagination_params: PaginationParams = Depends(),
-                          search: QuerySearchParam = Depends(),
-):
+                                 request: Request,
+                                 services: ServiceCollection = Depends(services),
+                                 pagination_params: PaginationParams = Depends(),
+                                 search: QuerySearchParam = Depends(),
+                                 ):
         """
         Serve the commits search page
         """
         commits = await services.github_workflow_runner_service.list_commits(
             search.query,
             pagination_params.page,
-            pagination_params.size
+            pagination_params.size,
+            pagination_params.cursor
         )
         return templates.TemplateResponse(
             "commits.html", {"request": request,
-                                     "user": request.session.get("username", None),
-                                     "results": commits.items,
-                                     "query": search.query,
-                                     "size": pagination_params.size}
-        )
\ No newline at end of file
+                             "user": request.session.get("username", None),
+                             "results": commits.items,
+                             "query": search.query,
+                             "size": pagination_params.size,
+                             "next_cursor": commits.next_cursor}
+        )
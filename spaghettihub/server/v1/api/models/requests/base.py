@@ -10,6 +10,9 @@ class PaginationParams(BaseModel):
 
     page: int = Field(Query(default=1, ge=1))
     size: int = Field(Query(default=DEFAULT_PAGE_SIZE, le=MAX_PAGE_SIZE, ge=1))
+    # The `next_cursor` of the previous page. When set, `page` is ignored.
+    cursor: str | None = Field(Query(default=None, max_length=256))
+
 
 class QuerySearchParam(BaseModel):
     query: str = Field(Query())
@@ -0,0 +1,10 @@
+from fastapi import Query
+from pydantic import BaseModel, Field
+
+from spaghettihub.common.models.merge_proposals import (
+    MergeProposalSearchMode, MergeProposalSearchOrder)
+
+
+class MergeProposalSearchParams(BaseModel):
+    mode: MergeProposalSearchMode = Field(Query(default=MergeProposalSearchMode.SUBSTRING))
+    order: MergeProposalSearchOrder = Field(Query(default=MergeProposalSearchOrder.RELEVANCE))
@@ -1,4 +1,4 @@
-from typing import Generic, Sequence, TypeVar
+from typing import Generic, Optional, Sequence, TypeVar
 
 from pydantic import BaseModel
 from pydantic.generics import GenericModel
@@ -17,5 +17,6 @@ class PaginatedResponse(GenericModel, Generic[T]):
     Derived classes should overwrite the items property
     """
 
-    total: int
+    total: Optional[int]
     items: Sequence[T]
+    next_cursor: Optional[str] = None
@@ -14,9 +14,12 @@ class MergeProposalResponse(BaseResponse):
     target_git_path: str
     registrant_name: str
     web_link: str
+    description: str | None = None
+    # Only set by the semantic search.
+    score: float | None = None
 
     @staticmethod
-    def from_model(entity: MergeProposal) -> "MergeProposalResponse":
+    def from_model(entity: MergeProposal, score: float | None = None) -> "MergeProposalResponse":
         response = MergeProposalResponse(
             id=entity.id,
             commit_message=entity.commit_message,
@@ -24,7 +27,9 @@ class MergeProposalResponse(BaseResponse):
             source_git_path=entity.source_git_path,
             target_git_path=entity.target_git_path,
             registrant_name=entity.registrant_name,
-            web_link=entity.web_link
+            web_link=entity.web_link,
+            description=entity.description,
+            score=score
         )
         return response
 
@@ -1,40 +1,92 @@
 import asyncio
-import multiprocessing
+import time
+import traceback
+from dataclasses import dataclass
+from multiprocessing.context import SpawnProcess
+from typing import List, Tuple
 
+import torch
+import torch.multiprocessing  # noqa: F401 registers the pickling of the tensors through shared memory
 from sqlalchemy.ext.asyncio import create_async_engine
-from transformers import AutoModel, AutoTokenizer
 
 from spaghettihub.common.db.base import ConnectionProvider
+from spaghettihub.common.llm.registry import MODEL_NAME, MODELS, TORCH
+from spaghettihub.common.models.texts import MyText
 from spaghettihub.common.services.collection import ServiceCollection
 
 
-class EmbeddingWorker(multiprocessing.Process):
-    def __init__(self, dsn, queue, daemon=True):
+@dataclass
+class ChunkProcessed:
+    worker_id: int
+    size: int
+    elapsed: float
+    # The highest text id of the chunk.
+    last_id: int
+
+
+@dataclass
+class WorkerFailed:
+    worker_id: int
+    error: str
+
+
+class EmbeddingWorker(SpawnProcess):
+    """
+    Embed the chunks of texts taken from `task_queue` until a `None` sentinel is received. Every processed chunk and
+    any failure is reported on `result_queue`.
+
+    The worker uses the `shared` (tokenizer, model) of the parent process, see `ModelRegistry.share`, or loads its own
+    on the first chunk.
+    """
+
+    def __init__(self, worker_id: int, dsn: str, task_queue, result_queue, num_threads: int, batch_size: int,
+                 chunking: bool = False, model_name: str = MODEL_NAME, backend: str = TORCH,
+                 shared: Tuple | None = None, daemon=True):
         super().__init__(daemon=daemon)
-        self.text_queue = queue
+        self.worker_id = worker_id
         self.dsn = dsn
+        self.task_queue = task_queue
+        self.result_queue = result_queue
+        self.num_threads = num_threads
+        self.batch_size = batch_size
+        self.chunking = chunking
+        self.model_name = model_name
+        self.backend = backend
+        self.shared = shared
 
-    async def process_embedding(self, model, tokenizer, engine, connection_provider, services, text):
-        async with engine.connect() as conn:
-            async with conn.begin():
-                connection_provider.current_connection = conn
-                await services.embeddings_service.generate_and_store_embedding(
-                    tokenizer, model, text
-                )
+    async def process_chunk(self, model, tokenizer, engine, connection_provider, services, chunk: List[MyText]):
+        # Texts of similar length end up in the same batch, so that there is little padding to run through the model.
+        chunk = sorted(chunk, key=lambda text: len(text.content))
+        for i in range(0, len(chunk), self.batch_size):
+            async with engine.connect() as conn:
+                async with conn.begin():
+                    connection_provider.current_connection = conn
+                    await services.embeddings_service.generate_and_store_embeddings(
+                        tokenizer, model, chunk[i:i + self.batch_size], chunking=self.chunking
+                    )
 
     async def _run(self):
-        model = AutoModel.from_pretrained("BAAI/bge-large-en-v1.5")
-        tokenizer = AutoTokenizer.from_pretrained("BAAI/bge-large-en-v1.5")
+        # Each worker gets its own share of the cores, otherwise the torch thread pools fight each other.
+        torch.set_num_threads(self.num_threads)
         engine = create_async_engine(self.dsn)
         connection_provider = ConnectionProvider(current_connection=None)
         services = ServiceCollection.produce(connection_provider)
-
-        while True:
-            while not self.text_queue.empty():
-                text = self.text_queue.get()
-                await self.process_embedding(model, tokenizer, engine, connection_provider, services, text)
-
-            await asyncio.sleep(0.5)  # Avoid unnecessary clock cycles
+        if self.shared is not None:
+            MODELS.put(*self.shared, self.model_name, self.backend)
+        try:
+            while (chunk := self.task_queue.get()) is not None:
+                tokenizer, model = MODELS.get(self.model_name, self.backend)
+                start = time.monotonic()
+                await self.process_chunk(model, tokenizer, engine, connection_provider, services, chunk)
+                self.result_queue.put(ChunkProcessed(
+                    self.worker_id, len(chunk), time.monotonic() - start, max(text.id for text in chunk)
+                ))
+        finally:
+            await engine.dispose()
 
     def run(self):
-        asyncio.run(self._run())
+        try:
+            asyncio.run(self._run())
+        except Exception:
+            self.result_queue.put(WorkerFailed(self.worker_id, traceback.format_exc()))
+            raise
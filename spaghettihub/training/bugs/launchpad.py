@@ -0,0 +1,88 @@
+import asyncio
+from datetime import datetime
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+
+import aiohttp
+
+from spaghettihub.common.models.bugs import LaunchpadBug
+
+LAUNCHPAD_API_URL = "https://api.launchpad.net/devel"
+
+
+class LaunchpadClient:
+    """
+    Read only client of the Launchpad REST API. At most `concurrency` requests are in flight at any time, whatever the
+    number of tasks using the client.
+    """
+
+    PAGE_SIZE = 300
+    RETRIES = 3
+    RETRY_DELAY = 1.0
+
+    def __init__(self, session: aiohttp.ClientSession, base_url: str = LAUNCHPAD_API_URL, concurrency: int = 16):
+        self.session = session
+        self.base_url = base_url.rstrip("/")
+        self.semaphore = asyncio.Semaphore(concurrency)
+
+    async def _get_json(self, url: str, params=None) -> Dict[str, Any]:
+        for attempt in range(self.RETRIES):
+            async with self.semaphore:
+                async with self.session.get(url, params=params) as response:
+                    # Launchpad answers with a 5xx every now and then under load: give it a second chance.
+                    if response.status < 500 or attempt == self.RETRIES - 1:
+                        if not 200 <= int(response.status) < 300:
+                            raise RuntimeError(f"GET {url}: status {response.status}")
+                        return await response.json(content_type=None)
+            await asyncio.sleep(self.RETRY_DELAY * 2 ** attempt)
+
+    async def _collection(self, url: str, params=None) -> AsyncIterator[Dict[str, Any]]:
+        while url:
+            page = await self._get_json(url, params)
+            for entry in page["entries"]:
+                yield entry
+            # The next link already contains the query parameters.
+            url = page.get("next_collection_link")
+            params = None
+
+    async def search_tasks(
+            self,
+            project: str,
+            statuses: List[str],
+            created_since: Optional[datetime] = None,
+            modified_since: Optional[datetime] = None,
+    ) -> AsyncIterator[str]:
+        """
+        The API links of the bugs with a task in `project` in one of `statuses`.
+        """
+        params = [("ws.op", "searchTasks"), ("ws.size", str(self.PAGE_SIZE))]
+        params += [("status", status) for status in statuses]
+        if created_since:
+            params.append(("created_since", created_since.isoformat()))
+        if modified_since:
+            params.append(("modified_since", modified_since.isoformat()))
+        async for task in self._collection(f"{self.base_url}/{project}", params):
+            yield task["bug_link"]
+
+    async def get_bug(
+            self, bug_link: str, is_current: Callable[[int, datetime], bool] | None = None
+    ) -> Optional[LaunchpadBug]:
+        """
+        The bug with its messages, or None if `is_current(id, date_last_updated)`: the messages take most of the
+        requests, and a bug that did not change since it was imported does not need them.
+        """
+        bug = await self._get_json(bug_link)
+        date_last_updated = datetime.fromisoformat(bug["date_last_updated"])
+        if is_current and is_current(bug["id"], date_last_updated):
+            return None
+        messages = [
+            message["content"] async for message in self._collection(bug["messages_collection_link"])
+        ]
+        return LaunchpadBug(
+            id=bug["id"],
+            title=bug["title"],
+            description=bug["description"],
+            date_created=datetime.fromisoformat(bug["date_created"]),
+            date_last_updated=date_last_updated,
+            web_link=bug["web_link"],
+            messages=messages,
+        )
@@ -0,0 +1,97 @@
+import asyncio
+from datetime import datetime
+from typing import AsyncIterator, Awaitable, Callable, List
+
+from spaghettihub.common.models.bugs import LaunchpadBug
+from spaghettihub.training.bugs.launchpad import LaunchpadClient
+
+
+class BugIngestionPipeline:
+    """
+    Producer/consumer ingestion of Launchpad bugs:
+
+    - the producer walks the search results and queues the bug links, skipping the bugs already queued;
+    - `fetchers` tasks download the bugs and their messages concurrently, skipping the bugs for which
+      `is_current(id, date_last_updated)` before fetching their messages;
+    - a single writer hands the fetched bugs to `write_batch` in batches of up to `batch_size`.
+
+    Both queues are bounded: when the database falls behind the fetchers stop, and when the fetchers fall behind the
+    search pagination stops, so the memory usage does not depend on the number of bugs.
+    """
+
+    def __init__(
+            self,
+            client: LaunchpadClient,
+            write_batch: Callable[[List[LaunchpadBug]], Awaitable[None]],
+            fetchers: int = 16,
+            batch_size: int = 50,
+            queue_size: int = 256,
+            on_written: Callable[[int], None] | None = None,
+            is_current: Callable[[int, datetime], bool] | None = None,
+    ):
+        self.client = client
+        self.write_batch = write_batch
+        self.fetchers = fetchers
+        self.batch_size = batch_size
+        self.queue_size = queue_size
+        self.on_written = on_written
+        self.is_current = is_current
+        self.skipped = 0
+
+    async def _produce(self, sources: List[AsyncIterator[str]], links: asyncio.Queue) -> None:
+        # A bug has a task per series and shows up in more than one search: fetch it once.
+        seen = set()
+        for source in sources:
+            async for link in source:
+                if link not in seen:
+                    seen.add(link)
+                    await links.put(link)
+        for _ in range(self.fetchers):
+            await links.put(None)
+
+    async def _fetch(self, links: asyncio.Queue, bugs: asyncio.Queue) -> None:
+        while (link := await links.get()) is not None:
+            bug = await self.client.get_bug(link, self.is_current)
+            if bug is None:
+                self.skipped += 1
+            else:
+                await bugs.put(bug)
+        await bugs.put(None)
+
+    async def _write(self, bugs: asyncio.Queue) -> int:
+        written = 0
+        running = self.fetchers
+        batch = []
+        while running:
+            bug = await bugs.get()
+            if bug is None:
+                running -= 1
+            else:
+                batch.append(bug)
+            # Flush a full batch, or whatever is there when the fetchers are slower than the writer.
+            if batch and (len(batch) >= self.batch_size or bugs.empty()):
+                await self.write_batch(batch)
+                written += len(batch)
+                if self.on_written:
+                    self.on_written(len(batch))
+                batch = []
+        return written
+
+    async def run(self, sources: List[AsyncIterator[str]]) -> int:
+        """
+        Ingest the bugs of all the `sources` and return how many were written.
+        """
+        links = asyncio.Queue(maxsize=self.queue_size)
+        bugs = asyncio.Queue(maxsize=self.queue_size)
+        tasks = [asyncio.create_task(self._produce(sources, links))]
+        tasks += [asyncio.create_task(self._fetch(links, bugs)) for _ in range(self.fetchers)]
+        tasks.append(writer := asyncio.create_task(self._write(bugs)))
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            # Do not leave the other stages blocked on the queues.
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        return writer.result()